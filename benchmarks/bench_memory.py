@@ -0,0 +1,76 @@
+"""
+bench_memory.py: compares the memory taken by the slotted Transaction and
+Posting records with plain dataclasses that keep an amounts dict per posting
+
+Both layouts are built from the same parsed journal and share its dates,
+accounts, commodities and amounts, so only the records themselves are counted.
+
+Usage: python benchmarks/bench_memory.py [TRANSACTIONS]
+"""
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from generate_journal import temp_journal
+from ledgeroni.journal import Journal
+from ledgeroni.types import Posting, Transaction
+
+
+@dataclass(frozen=True)
+class DictPosting:
+    "The posting layout before slots"
+    account: Tuple[str]
+    amounts: Dict = field(default_factory=dict)
+
+
+@dataclass
+class DictTransaction:
+    "The transaction layout before slots"
+    date: object
+    description: str
+    postings: List[DictPosting] = field(default_factory=list)
+
+
+def slotted_copy(trans: Transaction) -> Transaction:
+    return Transaction(trans.date, trans.description,
+                       [Posting(p.account, p.amounts) for p in trans.postings])
+
+
+def dict_copy(trans: Transaction) -> DictTransaction:
+    return DictTransaction(trans.date, trans.description,
+                           [DictPosting(p.account, p.amounts)
+                            for p in trans.postings])
+
+
+def measure(transactions: List[Transaction], build) -> int:
+    "Returns the bytes allocated by building a copy of every transaction"
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copies = [build(trans) for trans in transactions]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del copies
+    return size
+
+
+def main(transactions):
+    path = temp_journal(transactions)
+    try:
+        journal = Journal()
+        journal.add_from_file(path)
+    finally:
+        os.remove(path)
+    postings = sum(len(t.postings) for t in journal.transactions)
+    print('{} transactions, {} postings'.format(len(journal.transactions),
+                                                postings))
+    for name, build in (('dataclass + dict', dict_copy),
+                        ('slotted', slotted_copy)):
+        size = measure(journal.transactions, build)
+        print('{:<18} {:>12,} bytes {:>8.1f} bytes/posting'.format(
+            name, size, size / postings))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
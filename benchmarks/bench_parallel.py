@@ -0,0 +1,32 @@
+"""
+bench_parallel.py: measures how parsing scales with the number of workers
+
+Usage: python benchmarks/bench_parallel.py [TRANSACTIONS]
+"""
+import os
+import sys
+import time
+
+from generate_journal import temp_journal
+from ledgeroni import parallel
+
+
+def main(transactions):
+    path = temp_journal(transactions)
+    try:
+        print('{} transactions, {:.1f} MB, {} CPUs'.format(
+            transactions, os.path.getsize(path) / 2**20, os.cpu_count()))
+        baseline = None
+        for jobs in (1, 2, 4, 8):
+            start = time.perf_counter()
+            count = sum(1 for _ in parallel.read_files([path], jobs))
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print('{} workers {:>8.3f}s {:>6.2f}x ({} objects)'.format(
+                jobs, elapsed, baseline / elapsed, count))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,52 @@
+"""
+bench_parser.py: compares the line pipeline with the single pass scanner
+
+Usage: python benchmarks/bench_parser.py [TRANSACTIONS]
+"""
+import os
+import sys
+import time
+
+from generate_journal import temp_journal
+from ledgeroni import parser
+
+
+def old_lines(filename):
+    "The load_lines -> remove_comments -> remove_empty_lines chain"
+    iterator = parser.load_lines(filename)
+    iterator = parser.remove_comments(iterator)
+    return parser.remove_empty_lines(iterator)
+
+
+def timed(func, *args):
+    "Returns the best wall time of three runs of exhausting `func(*args)`"
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in func(*args):
+            pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(transactions):
+    path = temp_journal(transactions)
+    try:
+        with open(path) as filep:
+            lines = sum(1 for _ in filep)
+        print('{} lines, {} transactions'.format(lines, transactions))
+        for name, func in (('line pipeline', old_lines),
+                           ('scanner', parser.scan_file),
+                           ('read_lines(pipeline)',
+                            lambda f: parser.read_lines(old_lines(f))),
+                           ('read_file(scanner)', parser.read_file)):
+            elapsed = timed(func, path)
+            print('{:<22} {:>8.3f}s {:>12,.0f} lines/s'.format(
+                name, elapsed, lines / elapsed))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,63 @@
+"""
+bench_query.py: compares running filter expressions as query trees with
+running their compiled form
+
+Usage: python benchmarks/bench_query.py [TRANSACTIONS]
+"""
+import os
+import sys
+import time
+
+from generate_journal import temp_journal
+from ledgeroni import expression
+from ledgeroni.journal import Journal
+
+EXPRESSIONS = [
+    'Food',
+    'Food or Travel or Rent or Utilities or Salary or Reddit',
+    'Expenses and not ( Food or Travel ) or @Amazon',
+    'not ( Bank or Bitcoin or Credit ) and ( Expenses or Income ) and '
+    'not @Joe and not ( Hotels or Flights or Groceries or Power )',
+    ' or '.join('Account{}'.format(i) for i in range(40)) + ' or Rent',
+]
+
+
+def timed(func):
+    "Returns the best wall time of three runs of `func`"
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_query(journal, query):
+    "Selects transactions and postings like the reports do"
+    for transaction in journal.transactions:
+        if query.matches(transaction):
+            for _ in query.postings_matching(transaction):
+                pass
+
+
+def main(transactions):
+    path = temp_journal(transactions)
+    try:
+        journal = Journal()
+        journal.add_from_file(path)
+    finally:
+        os.remove(path)
+    postings = sum(len(t.postings) for t in journal.transactions)
+    print('{} transactions, {} postings'.format(transactions, postings))
+    for expr in EXPRESSIONS:
+        query = expression.build_expression(expr)
+        tree = timed(lambda: run_query(journal, query))
+        compiled = timed(lambda: run_query(journal, query.compile()))
+        print('{:.60}'.format(expr))
+        print('    tree {:>8.3f}s  compiled {:>8.3f}s  {:>5.1f}x'.format(
+            tree, compiled, tree / compiled))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,61 @@
+"""
+generate_journal.py: writes large synthetic journals for benchmarking
+"""
+import os
+import random
+import sys
+import tempfile
+
+ACCOUNTS = [
+    'Assets:Bank:Checking', 'Assets:Bank:Savings', 'Assets:Bitcoin Wallet',
+    'Expenses:Food:Groceries', 'Expenses:Food:Restaurants',
+    'Expenses:Travel:Flights', 'Expenses:Travel:Hotels', 'Expenses:Rent',
+    'Expenses:Utilities:Power', 'Expenses:Web Services:Reddit',
+    'Income:Salary', 'Income:ClientX:Work', 'Liabilities:Credit Card',
+    'Payable:Joe:Favor', 'Receivable:ClientX',
+]
+PAYEES = ['Amazon', 'Grocery Mart', 'Airline Co', 'Hotel Inn', 'Landlord',
+          'Power Co', 'Employer', 'Client X', 'Joe', 'Coffee Shop']
+COMMODITIES = ['AU', 'AG', 'BTC', 'CAD', 'EUR']
+
+
+def generate_journal(path: str, transactions: int, seed: int = 0):
+    "Writes a journal with `transactions` transactions and some price lines"
+    rnd = random.Random(seed)
+    with open(path, 'w') as filep:
+        filep.write('; Generated journal\nD $1,000.00\nN $\n\n')
+        for i in range(transactions):
+            year = 2000 + i * 20 // max(transactions, 1)
+            date = '{}/{}/{}'.format(year, rnd.randint(1, 12),
+                                     rnd.randint(1, 28))
+            if i % 50 == 0:
+                filep.write('P {} 05:04:00 {} ${:.2f}\n'.format(
+                    date, rnd.choice(COMMODITIES), rnd.uniform(1, 2000)))
+            if i % 10 == 0:
+                filep.write('; Batch {}\n\n'.format(i // 10))
+            filep.write('{} {} #{}\n'.format(date, rnd.choice(PAYEES), i))
+            src, dest = rnd.sample(ACCOUNTS, 2)
+            cents = rnd.randint(100, 500000)
+            filep.write('\t{}\t\t${:,}.{:02} ; memo\n'.format(
+                src, cents // 100, cents % 100))
+            if i % 7 == 0:
+                half = cents // 2
+                for account, part in ((rnd.choice(ACCOUNTS), half),
+                                      (dest, cents - half)):
+                    filep.write('    {}  -${}.{:02}\n'.format(
+                        account, part // 100, part % 100))
+            else:
+                filep.write('    {}\n'.format(dest))
+            filep.write('\n')
+
+
+def temp_journal(transactions: int) -> str:
+    "Generates a journal in a temporary file and returns its path"
+    fd, path = tempfile.mkstemp(suffix='.ledger')
+    os.close(fd)
+    generate_journal(path, transactions)
+    return path
+
+
+if __name__ == '__main__':
+    generate_journal(sys.argv[1], int(sys.argv[2]))
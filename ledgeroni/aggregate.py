@@ -1,25 +1,33 @@
 """
 aggregate.py: tool for building aggregates over accounts in dynamically
 """
-from fractions import Fraction
 from dataclasses import dataclass, field
-from typing import Dict, Tuple, Iterator
+from typing import Dict, Iterable, Sequence, Tuple, Iterator
 from collections import defaultdict, deque
+from ledgeroni.amount import Amount
 from ledgeroni.types import Commodity, Transaction
 from ledgeroni.query import Query, MATCH_ALL
 from ledgeroni.journal import Journal
+from ledgeroni.frame import JournalFrame, NO_COMMODITY
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+INT64_MAX = 2 ** 63 - 1
 
 
 @dataclass
 class AccountAggregate:
     "Builds a tree to calculate account and subaccount aggregates on the fly."
-    own_balances: Dict = field(default_factory=lambda: defaultdict(Fraction))
+    own_balances: Dict = field(default_factory=lambda: defaultdict(Amount))
     subaccounts: Dict = field(
         default_factory=lambda: defaultdict(AccountAggregate))
-    aggregates: Dict = field(default_factory=lambda: defaultdict(Fraction))
+    aggregates: Dict = field(default_factory=lambda: defaultdict(Amount))
     query: Query = MATCH_ALL
 
-    def add_commodity(self, account: Tuple[str], amount: Fraction,
+    def add_commodity(self, account: Tuple[str], amount: Amount,
                       commodity: Commodity):
         """
         Updates given account and parent accounts with the given amount  of
@@ -37,16 +45,48 @@ class AccountAggregate:
         "Adds a given transactions postings to the aggregate"
         transaction = transaction.calc_totals()
         for posting in self.query.postings_matching(transaction):
-            if posting.amounts is None:
-                continue
-            for commodity, amount in posting.amounts.items():
+            for commodity, amount in posting.amount_items():
                 self.add_commodity(posting.account, amount, commodity)
 
     def add_from_journal(self, journal: Journal):
         "Adds all transactions in a journal to the aggregate"
-        for transaction in journal.transactions:
+        for transaction in journal.candidates(self.query):
             self.add_transaction(transaction)
 
+    def add_from_transactions(self, transactions: Iterable[Transaction]):
+        """
+        Adds transactions that are only seen once, like the ones being read
+        from a file, summing every account and commodity pair before adding
+        it to the tree
+        """
+        totals = {}
+        for transaction in transactions:
+            transaction = transaction.calc_totals()
+            for posting in self.query.postings_matching(transaction):
+                for commodity, amount in posting.amount_items():
+                    key = posting.account, commodity
+                    total = totals.get(key)
+                    totals[key] = amount if total is None else total + amount
+        for (account, commodity), total in totals.items():
+            self.add_commodity(account, total, commodity)
+
+    def add_from_frame(self, frame: JournalFrame,
+                       transactions: Sequence[Transaction] = None,
+                       candidates: Sequence[int] = None):
+        """
+        Adds the postings of a frame to the aggregate, like
+        `add_from_journal`, but summing every account and commodity pair once
+        before adding it to the tree. `transactions` are the ones the frame
+        was built from, see `JournalFrame.match_rows`.
+        """
+        mask = frame.match_rows(self.query, transactions, candidates)
+        accounts = frame.names.accounts
+        commodities = frame.names.commodities
+        for account, commodity, total in group_totals(frame, mask):
+            self.add_commodity(accounts[account],
+                               Amount(total, frame.scales[commodity]),
+                               commodities[commodity])
+
     def iter_aggregates(self) -> Iterator[Tuple[int, str, Dict]]:
         """Iterates through all aggregates in a depth first search, yielding
         visited accounts in a preorder fashion.
@@ -69,3 +109,46 @@ class AccountAggregate:
                         name += ':' + child_name
                         agg = child
                 stack.append((agg, level, name))
+
+
+def group_totals(frame: JournalFrame,
+                 mask: Sequence[bool]) -> Iterator[Tuple[int, int, int]]:
+    """
+    Sums the scaled amounts of the rows selected by `mask` for each account
+    and commodity, yielding `(account id, commodity id, total)` in the order
+    each pair first appears
+    """
+    if numpy is None or not isinstance(frame.amount, numpy.ndarray):
+        yield from _group_totals_python(frame, mask)
+        return
+    rows = numpy.flatnonzero(mask & (frame.commodity != NO_COMMODITY))
+    if not len(rows):
+        return
+    width = len(frame.names.commodities)
+    keys = frame.account[rows] * width + frame.commodity[rows]
+    groups, first, inverse = numpy.unique(keys, return_index=True,
+                                          return_inverse=True)
+    amounts = frame.amount[rows]
+    if amounts.dtype != object and (
+            int(numpy.abs(amounts).max()) > INT64_MAX // len(amounts)):
+        # The sums could overflow
+        amounts = amounts.astype(object)
+    totals = numpy.zeros(len(groups), dtype=amounts.dtype)
+    numpy.add.at(totals, inverse.ravel(), amounts)
+    for group in numpy.argsort(first, kind='stable').tolist():
+        key = int(groups[group])
+        yield key // width, key % width, int(totals[group])
+
+
+def _group_totals_python(
+        frame: JournalFrame,
+        mask: Sequence[bool]) -> Iterator[Tuple[int, int, int]]:
+    "`group_totals` without NumPy"
+    totals = {}
+    for selected, account, commodity, amount in zip(
+            mask, frame.account, frame.commodity, frame.amount):
+        if selected and commodity != NO_COMMODITY:
+            key = account, commodity
+            totals[key] = totals.get(key, 0) + int(amount)
+    for (account, commodity), total in totals.items():
+        yield account, commodity, total
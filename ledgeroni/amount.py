@@ -0,0 +1,202 @@
+"""
+amount.py: exact fixed point amounts
+
+Journal amounts are decimals, so they are kept as an integer scaled by a power
+of ten. Adding amounts only needs integer arithmetic, unlike `Fraction` which
+normalizes with a gcd on every operation. Operations whose result is not a
+decimal, like mixing with a `Fraction` or dividing, fall back to `Fraction`.
+"""
+from __future__ import annotations
+from fractions import Fraction
+from typing import Tuple, Union
+
+Number = Union['Amount', int, Fraction, float]
+
+
+class Amount:
+    "An exact amount, equal to `value / 10 ** scale`"
+    __slots__ = ('value', 'scale')
+
+    def __init__(self, value: int = 0, scale: int = 0):
+        self.value = value
+        self.scale = scale
+
+    @classmethod
+    def from_string(cls, amtstr: str) -> Amount:
+        "Reads a decimal like `-1751.90`, without thousands separators"
+        whole, dot, decimals = amtstr.partition('.')
+        if not dot:
+            return cls(int(whole), 0)
+        if not (whole or decimals) or not (decimals or '0').isdigit():
+            raise ValueError('invalid amount: {!r}'.format(amtstr))
+        if whole in ('', '-', '+'):
+            whole += '0'
+        return cls(int(whole + decimals), len(decimals))
+
+    @property
+    def numerator(self) -> int:
+        return self.as_fraction().numerator
+
+    @property
+    def denominator(self) -> int:
+        return self.as_fraction().denominator
+
+    def as_fraction(self) -> Fraction:
+        "The amount as a Fraction"
+        return Fraction(self.value, 10 ** self.scale)
+
+    def rescale(self, scale: int) -> Amount:
+        "Returns the same amount with at least `scale` decimal places"
+        if scale <= self.scale:
+            return self
+        return Amount(self.value * 10 ** (scale - self.scale), scale)
+
+    def _align(self, other: Amount) -> Tuple[int, int, int]:
+        "Returns both values scaled to the same scale, along with the scale"
+        if self.scale == other.scale:
+            return self.value, other.value, self.scale
+        if self.scale < other.scale:
+            return (self.value * 10 ** (other.scale - self.scale),
+                    other.value, other.scale)
+        return (self.value, other.value * 10 ** (self.scale - other.scale),
+                self.scale)
+
+    def _coerce(self, other: Number):
+        "Converts `other` to an Amount if possible, or returns it as is"
+        if isinstance(other, int):
+            return Amount(other, 0)
+        return other
+
+    def __add__(self, other: Number):
+        if other.__class__ is Amount and other.scale == self.scale:
+            return Amount(self.value + other.value, self.scale)
+        other = self._coerce(other)
+        if isinstance(other, Amount):
+            left, right, scale = self._align(other)
+            return Amount(left + right, scale)
+        if isinstance(other, Fraction):
+            return self.as_fraction() + other
+        if isinstance(other, float):
+            return float(self) + other
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Number):
+        if other.__class__ is Amount and other.scale == self.scale:
+            return Amount(self.value - other.value, self.scale)
+        other = self._coerce(other)
+        if isinstance(other, Amount):
+            left, right, scale = self._align(other)
+            return Amount(left - right, scale)
+        if isinstance(other, Fraction):
+            return self.as_fraction() - other
+        if isinstance(other, float):
+            return float(self) - other
+        return NotImplemented
+
+    def __rsub__(self, other: Number):
+        return -self + other
+
+    def __mul__(self, other: Number):
+        other = self._coerce(other)
+        if isinstance(other, Amount):
+            return Amount(self.value * other.value, self.scale + other.scale)
+        if isinstance(other, Fraction):
+            return self.as_fraction() * other
+        if isinstance(other, float):
+            return float(self) * other
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Number):
+        if isinstance(other, (Amount, int, Fraction)):
+            return self.as_fraction() / _as_rational(other)
+        if isinstance(other, float):
+            return float(self) / other
+        return NotImplemented
+
+    def __rtruediv__(self, other: Number):
+        if isinstance(other, (int, Fraction)):
+            return other / self.as_fraction()
+        if isinstance(other, float):
+            return other / float(self)
+        return NotImplemented
+
+    def __neg__(self) -> Amount:
+        return Amount(-self.value, self.scale)
+
+    def __pos__(self) -> Amount:
+        return self
+
+    def __abs__(self) -> Amount:
+        return Amount(abs(self.value), self.scale)
+
+    def __bool__(self) -> bool:
+        return self.value != 0
+
+    def __float__(self) -> float:
+        return self.value / 10 ** self.scale
+
+    def _compare(self, other: Number):
+        """
+        Returns `(left, right)` values that compare like `self` and `other`,
+        or None if `other` can't be compared
+        """
+        other = self._coerce(other)
+        if isinstance(other, Amount):
+            left, right, _ = self._align(other)
+            return left, right
+        if isinstance(other, (Fraction, float)):
+            return self.as_fraction(), other
+        return None
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, int):
+            return self.value == other * 10 ** self.scale
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] == pair[1]
+
+    def __lt__(self, other) -> bool:
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] < pair[1]
+
+    def __le__(self, other) -> bool:
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] <= pair[1]
+
+    def __gt__(self, other) -> bool:
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] > pair[1]
+
+    def __ge__(self, other) -> bool:
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] >= pair[1]
+
+    def __hash__(self) -> int:
+        # Hash like the equal int, Fraction or float would
+        if self.scale == 0:
+            return hash(self.value)
+        return hash(self.as_fraction())
+
+    def __reduce__(self):
+        return (Amount, (self.value, self.scale))
+
+    def __str__(self) -> str:
+        if self.scale == 0:
+            return str(self.value)
+        digits = str(abs(self.value)).rjust(self.scale + 1, '0')
+        sign = '-' if self.value < 0 else ''
+        return '{}{}.{}'.format(sign, digits[:-self.scale],
+                                digits[-self.scale:])
+
+    def __repr__(self) -> str:
+        return 'Amount({!r})'.format(str(self))
+
+
+def _as_rational(number: Number) -> Union[int, Fraction]:
+    "Converts an Amount to a Fraction, leaving ints and Fractions untouched"
+    if isinstance(number, Amount):
+        return number.as_fraction()
+    return number
@@ -0,0 +1,180 @@
+"""
+cache.py: persistent on-disk cache of parsed journal files
+
+Every journal file is cached on its own, with `include` directives kept as
+`Include` markers, so a change to one file only causes that file to be parsed
+again. A cached file is considered valid while its size and modification time
+are unchanged, or, if only the modification time changed, while its contents
+still hash the same.
+
+Journals usually only grow, so every record also remembers where the last
+entry of its file starts. When a file is found to have grown and all of the
+bytes the record was built from are unchanged, only the last entry and the
+bytes after it are parsed again.
+"""
+from __future__ import annotations
+import contextlib
+import hashlib
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+from ledgeroni import parser
+from ledgeroni.interning import InternTable
+from ledgeroni.types import Include
+
+CACHE_VERSION = 5
+CACHE_SUFFIX = '.ledgeroni-cache'
+
+
+def hash_bytes(data: bytes) -> str:
+    "Fingerprints the contents of a journal file"
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def parse_entries(data: bytes, cwd: str, start: int = 0,
+                  end: int = None) -> List:
+    """
+    Parses the entries between `start` and `end` without following includes.
+    Equal accounts and commodities are shared, so they are pickled only once.
+    """
+    tokens = parser.scan_buffer(data, cwd, follow_includes=False,
+                                start=start, end=end)
+    # Closed even if parsing fails, so `data` can be unmapped afterwards
+    with contextlib.closing(tokens):
+        return list(parser.read_tokens(tokens, InternTable()))
+
+
+@dataclass
+class FileRecord:
+    """
+    The parsed contents of a single journal file along with its fingerprint.
+    Parsing can be resumed at `resume_offset`, where the entry at
+    `resume_index` starts, as long as the file only had bytes appended.
+    """
+    size: int
+    mtime_ns: int
+    digest: str
+    entries: List
+    resume_offset: int
+    resume_index: int
+
+    @classmethod
+    def from_data(cls, data: bytes, cwd: str, mtime_ns: int,
+                  entries: List = (), start: int = 0) -> FileRecord:
+        """
+        Builds a record for `data`, reusing `entries` as the result of
+        parsing everything before `start` and parsing the rest
+        """
+        resume_offset = parser.last_entry_offset(data, start)
+        entries = list(entries)
+        entries += parse_entries(data, cwd, start, resume_offset)
+        resume_index = len(entries)
+        entries += parse_entries(data, cwd, resume_offset)
+
+        return cls(size=len(data), mtime_ns=mtime_ns,
+                   digest=hash_bytes(data), entries=entries,
+                   resume_offset=resume_offset, resume_index=resume_index)
+
+    def is_prefix_of(self, data: bytes) -> bool:
+        """
+        Whether `data` only appends to the bytes this record was built from,
+        so parsing can still be resumed at the start of its last entry
+        """
+        if len(data) <= self.size:
+            return False
+        offset = self.resume_offset
+        if offset < self.size and (
+                data[offset:offset + 1] not in parser.ENTRY_STARTS):
+            return False
+        with memoryview(data) as view:
+            return hash_bytes(view[:self.size]) == self.digest
+
+
+@dataclass
+class ParseCache:
+    """
+    Stores parsed journal files on disk. Cache files are kept next to each
+    journal unless a `cache_dir` is given.
+    """
+    cache_dir: Optional[str] = None
+
+    def cache_path(self, filename: str) -> str:
+        "Path of the file where the cache for `filename` is stored"
+        filename = os.path.abspath(filename)
+        if self.cache_dir is None:
+            dirname, basename = os.path.split(filename)
+            return os.path.join(dirname, '.' + basename + CACHE_SUFFIX)
+        key = hashlib.blake2b(filename.encode('utf-8'),
+                              digest_size=20).hexdigest()
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def load_record(self, filename: str) -> Optional[FileRecord]:
+        "Loads the stored record for `filename`, if there is a usable one"
+        try:
+            with open(self.cache_path(filename), 'rb') as filep:
+                version, record = pickle.load(filep)
+        except Exception:
+            # A damaged cache file can make unpickling fail in many ways,
+            # including MemoryError, and it only costs parsing again
+            return None
+        if version != CACHE_VERSION or not isinstance(record, FileRecord):
+            return None
+        return record
+
+    def store_record(self, filename: str, record: FileRecord):
+        "Atomically writes the record for `filename` to disk"
+        path = self.cache_path(filename)
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as filep:
+                pickle.dump((CACHE_VERSION, record), filep,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def get_record(self, filename: str) -> FileRecord:
+        """
+        Returns an up to date record for `filename`, parsing the file and
+        updating the cache if needed
+        """
+        stat = os.stat(filename)
+        record = self.load_record(filename)
+        if (record is not None and record.size == stat.st_size
+                and record.mtime_ns == stat.st_mtime_ns):
+            return record
+
+        # Included paths are stored absolute, as the record may be read again
+        # from another working directory
+        cwd = os.path.dirname(os.path.abspath(filename))
+        with parser.map_file(filename) as data:
+            if record is not None and record.size == len(data) and (
+                    record.digest == hash_bytes(data)):
+                # Touched but unchanged, just remember the new mtime
+                record.mtime_ns = stat.st_mtime_ns
+            elif record is not None and record.is_prefix_of(data):
+                record = FileRecord.from_data(
+                    data, cwd, stat.st_mtime_ns,
+                    entries=record.entries[:record.resume_index],
+                    start=record.resume_offset)
+            else:
+                record = FileRecord.from_data(data, cwd, stat.st_mtime_ns)
+        self.store_record(filename, record)
+        return record
+
+    def read_file(self, filename: str) -> Iterator:
+        """
+        Generates the journal objects of the file with the given filename,
+        like `parser.read_file`, but going through the cache
+        """
+        for entry in self.get_record(filename).entries:
+            if isinstance(entry, Include):
+                yield from self.read_file(entry.filename)
+            else:
+                yield entry
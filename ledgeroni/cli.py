@@ -4,12 +4,27 @@ cli.py: Main entrypoint for Click
 import click
 from colorama import init
 
+from ledgeroni.cache import ParseCache
+from ledgeroni.query import parse_day
 from ledgeroni.sorter import JournalSorter
 from ledgeroni.commands.balance import print_balance
+from ledgeroni.commands.explain import explain_query
 from ledgeroni.commands.print import print_transactions
 from ledgeroni.commands.register import print_register
 
-init()
+# Reports only color their output for terminals, see `render.Renderer`, so
+# colorama is only needed to translate escape codes on Windows
+init(strip=False)
+
+
+def parse_date_option(ctx, param, value):
+    "Parses a date given as an option"
+    if value is None:
+        return None
+    try:
+        return parse_day(value)
+    except ValueError:
+        raise click.BadParameter('invalid date: {}'.format(value))
 
 
 @click.group()
@@ -18,10 +33,24 @@ init()
 @click.option('--price-db', help='price database')
 @click.option('--sort', '-S', type=str,
               help='specifies how transactions should be sorted')
+@click.option('--cache', is_flag=True,
+              help='cache parsed journals next to the journal files')
+@click.option('--cache-dir', type=click.Path(file_okay=False),
+              help='cache parsed journals in this directory')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1,
+              help='number of processes used to parse large journals')
+@click.option('--begin', '-b', callback=parse_date_option,
+              help='only include transactions on or after this date')
+@click.option('--end', '-e', callback=parse_date_option,
+              help='only include transactions before this date')
+@click.option('--no-color', is_flag=True,
+              help='never color the output, even on a terminal')
 @click.pass_context
-def cli(ctx, ledger_files, price_db, sort):
+def cli(ctx, ledger_files, price_db, sort, cache, cache_dir, jobs, begin,
+        end, no_color):
     "Base ledgeroni command"
-    ctx.obj = {}
+    ctx.obj = {'JOBS': jobs, 'BEGIN': begin, 'END': end,
+               'COLOR': False if no_color else None}
     if ledger_files:
         ctx.obj['LEDGER_FILES'] = ledger_files
     if price_db:
@@ -30,10 +59,13 @@ def cli(ctx, ledger_files, price_db, sort):
         sorter = JournalSorter.from_term_list(s.strip() for s in
                                               sort.split(','))
         ctx.obj['SORTER'] = sorter
+    if cache or cache_dir:
+        ctx.obj['CACHE'] = ParseCache(cache_dir=cache_dir)
 
 
 cli.add_command(print_balance, name='balance')
 cli.add_command(print_balance, name='bal')
+cli.add_command(explain_query, name='explain')
 cli.add_command(print_transactions, name='print')
 cli.add_command(print_register, name='r')
 cli.add_command(print_register, name='reg')
@@ -1,55 +1,72 @@
 """
 balance.py: Defines the `balance` subcommand
 """
-import sys
 import click
-from colorama import Fore, Style
 
 from ledgeroni.journal import Journal
-from ledgeroni.query import MATCH_ALL
 from ledgeroni.aggregate import AccountAggregate
-from ledgeroni.util import format_amount
-from ledgeroni import expression
+from ledgeroni.frame import JournalFrame
+from ledgeroni.planner import Planner
+from ledgeroni.stream import read_transactions
+from ledgeroni.commands.errors import (build_filter_query,
+                                        exit_if_unbalanced)
+from ledgeroni.render import Renderer
+
+
+def aggregate_journal(journal, engine, filter_query):
+    "Builds the aggregate of a loaded journal"
+    filter_query = Planner(journal).plan(filter_query)
+    aggregate = AccountAggregate(query=filter_query)
+    if engine == 'grouped':
+        frame = JournalFrame.from_journal(journal)
+        aggregate.add_from_frame(frame, journal.transactions,
+                                 filter_query.candidates(journal))
+    else:
+        aggregate.add_from_journal(journal)
+    return aggregate
 
 
 @click.command()
+@click.option('--engine', type=click.Choice(['grouped', 'tree']),
+              default='grouped',
+              help='Sum each account and commodity once before building the '
+                   'account tree (grouped), or add every posting to the tree '
+                   '(tree).')
+@click.option('--stream', is_flag=True,
+              help='Aggregate transactions as they are read instead of '
+                   'loading the journal, which keeps memory use flat. The '
+                   'parse cache and parallel parsing are not used.')
 @click.argument('filter_strs', nargs=-1)
 @click.pass_context
-def print_balance(ctx, filter_strs):
+def print_balance(ctx, engine, stream, filter_strs):
     "`ledger balance` subcommand"
-    filter_query = MATCH_ALL
-    if filter_strs:
-        filter_query = expression.build_expression(' '.join(filter_strs))
-    journal = Journal()
-
-    aggregate = AccountAggregate(query=filter_query)
+    filter_query = build_filter_query(ctx, filter_strs)
 
+    filenames = list(ctx.obj.get('LEDGER_FILES', []))
     price_db = ctx.obj.get('PRICE_DB', None)
     if price_db:
-        journal.add_from_file(price_db)
-
-    for filename in ctx.obj.get('LEDGER_FILES', []):
-        journal.add_from_file(filename)
-
-    errors = journal.verify_transaction_balances()
-    if errors:
-        for error in errors:
-            errstr = 'ERROR! Transaction unbalanced: {}'.format(error.header)
-            click.echo(errstr, err=True)
-        sys.exit(1)
+        filenames.insert(0, price_db)
 
-    aggregate.add_from_journal(journal)
+    if stream:
+        errors = []
+        aggregate = AccountAggregate(query=filter_query)
+        aggregate.add_from_transactions(read_transactions(filenames, errors))
+        exit_if_unbalanced(errors)
+    else:
+        journal = Journal()
+        journal.add_from_files(filenames, cache=ctx.obj.get('CACHE', None),
+                               jobs=ctx.obj.get('JOBS', 1))
+        exit_if_unbalanced(journal.verify_transaction_balances())
+        aggregate = aggregate_journal(journal, engine, filter_query)
 
     balances = list(aggregate.iter_aggregates())
     _, _, total = balances[0]
     balances = balances[1:]
-    for level, name, aggregate in balances:
-        lvlstr = '\n'.join(format_amount(c, a)
-                           for c, a in aggregate.items())
-        lvlstr += '  ' * level + Fore.BLUE + name + Style.RESET_ALL
-        click.echo(lvlstr)
-    if len(balances) > 1:
-        click.echo('-' * 20)
-        totalstr = '\n'.join(format_amount(c, a)
-                             for c, a in total.items())
-        click.echo(totalstr)
+    with Renderer(color=ctx.obj.get('COLOR')) as r:
+        for level, name, aggregate in balances:
+            lvlstr = '\n'.join(r.amount(c, a) for c, a in aggregate.items())
+            lvlstr += '  ' * level + r.style(r.blue, name)
+            r.write(lvlstr)
+        if len(balances) > 1:
+            r.write('-' * 20)
+            r.write('\n'.join(r.amount(c, a) for c, a in total.items()))
@@ -0,0 +1,30 @@
+"""
+errors.py: Reports journal errors for the subcommands
+"""
+import sys
+import click
+
+from ledgeroni import expression
+
+
+def build_filter_query(ctx, filter_strs):
+    """
+    Builds the filter of a subcommand from its arguments and the `-b` and `-e`
+    options, reporting an invalid filter like an invalid option
+    """
+    try:
+        return expression.build_filter_query(
+            filter_strs, ctx.obj.get('BEGIN'), ctx.obj.get('END'))
+    except ValueError as err:
+        param = next(p for p in ctx.command.params if p.name == 'filter_strs')
+        raise click.BadParameter(str(err) or 'invalid filter expression',
+                                 ctx=ctx, param=param)
+
+
+def exit_if_unbalanced(errors):
+    "Reports unbalanced transactions and exits, if there are any"
+    if errors:
+        for error in errors:
+            errstr = 'ERROR! Transaction unbalanced: {}'.format(error.header)
+            click.echo(errstr, err=True)
+        sys.exit(1)
@@ -0,0 +1,32 @@
+"""
+explain.py: Defines the `explain` subcommand
+"""
+import click
+
+from ledgeroni.journal import Journal
+from ledgeroni.planner import Planner
+from ledgeroni.commands.errors import build_filter_query
+
+
+@click.command()
+@click.argument('filter_strs', nargs=-1)
+@click.pass_context
+def explain_query(ctx, filter_strs):
+    "`ledgeroni explain` subcommand, which shows how a filter is run"
+    filter_query = build_filter_query(ctx, filter_strs)
+
+    sorter = ctx.obj.get('SORTER', None)
+    journal = Journal()
+    filenames = list(ctx.obj.get('LEDGER_FILES', []))
+    price_db = ctx.obj.get('PRICE_DB', None)
+    if price_db:
+        filenames.insert(0, price_db)
+    journal.add_from_files(filenames, cache=ctx.obj.get('CACHE', None),
+                           jobs=ctx.obj.get('JOBS', 1))
+
+    if sorter:
+        sorter.sort_journal(journal)
+
+    planner = Planner(journal)
+    for line in planner.explain(planner.plan(filter_query)):
+        click.echo(line)
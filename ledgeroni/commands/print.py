@@ -1,40 +1,71 @@
 """
 print.py: Defines the `print` subcommand
 """
-import sys
 import click
 from ledgeroni.journal import Journal
-from ledgeroni import expression
-from ledgeroni.query import MATCH_ALL
+from ledgeroni.planner import Planner
+from ledgeroni.stream import read_transactions
+from ledgeroni.commands.errors import (build_filter_query,
+                                        exit_if_unbalanced)
+from ledgeroni.render import Renderer
+from ledgeroni.util import head_and_tail
 
 
 @click.command()
+@click.option('--stream', is_flag=True,
+              help='Print transactions as they are read instead of loading '
+                   'the journal first. Unbalanced transactions are reported '
+                   'at the end. Can\'t be used with --sort.')
+@click.option('--head', type=click.IntRange(min=0),
+              help='Only print the first N transactions. Unless sorting, '
+                   'reading stops once they are printed, so later '
+                   'transactions are not checked for balance.')
+@click.option('--tail', type=click.IntRange(min=0),
+              help='Only print the last N transactions.')
 @click.argument('filter_strs', nargs=-1)
 @click.pass_context
-def print_transactions(ctx, filter_strs):
+def print_transactions(ctx, stream, head, tail, filter_strs):
     "`ledgeroni print` subcommand"
-    filter_query = MATCH_ALL
-    if filter_strs:
-        filter_query = expression.build_expression(' '.join(filter_strs))
+    filter_query = build_filter_query(ctx, filter_strs)
 
     sorter = ctx.obj.get('SORTER', None)
-    journal = Journal()
+    filenames = list(ctx.obj.get('LEDGER_FILES', []))
     price_db = ctx.obj.get('PRICE_DB', None)
     if price_db:
-        journal.add_from_file(price_db)
+        filenames.insert(0, price_db)
 
-    for filename in ctx.obj.get('LEDGER_FILES', []):
-        journal.add_from_file(filename)
+    if stream and sorter:
+        raise click.UsageError('--stream can\'t be used with --sort')
 
-    errors = journal.verify_transaction_balances()
-    if errors:
-        for error in errors:
-            errstr = 'ERROR! Transaction unbalanced: {}'.format(error.header)
-            click.echo(errstr, err=True)
-        sys.exit(1)
+    errors = []
+    # Without sorting, the first transactions don't need the rest of the
+    # journal
+    if stream or (head is not None and not sorter):
+        transactions = (t for t in read_transactions(filenames, errors)
+                        if filter_query.matches(t))
+    else:
+        journal = Journal()
+        journal.add_from_files(filenames, cache=ctx.obj.get('CACHE', None),
+                               jobs=ctx.obj.get('JOBS', 1))
 
-    if sorter:
-        sorter.sort_journal(journal)
+        exit_if_unbalanced(journal.verify_transaction_balances())
 
-    click.echo('\n\n'.join(t.as_journal_format() for t in
-                           journal.transactions_matching(filter_query)))
+        if sorter:
+            sorter.sort_journal(journal)
+
+        filter_query = Planner(journal).plan(filter_query)
+        transactions = journal.transactions_matching(filter_query)
+    transactions = head_and_tail(transactions, head, tail)
+
+    # Streamed transactions are written as they come instead of in chunks
+    with Renderer(color=ctx.obj.get('COLOR'),
+                  line_buffered=stream or None) as renderer:
+        separator = ''
+        for transaction in transactions:
+            renderer.write(separator + transaction.as_journal_format())
+            renderer.end_entry()
+            separator = '\n'
+        if not separator:
+            renderer.write('')
+
+    exit_if_unbalanced(errors)
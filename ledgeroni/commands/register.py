@@ -2,70 +2,135 @@
 register.py: Defines the `register subcommand`
 """
 import itertools
-from os import sys
 import click
-from colorama import Fore, Style
 
-from ledgeroni.journal import Journal
-from ledgeroni.util import format_amount
-from ledgeroni import expression
-from ledgeroni.query import MATCH_ALL
+from ledgeroni.frame import JournalFrame
+from ledgeroni.journal import Journal, running_total_report
+from ledgeroni.planner import Planner
+from ledgeroni.running import RegisterRow, generate_running_totals
+from ledgeroni.stream import read_transactions
+from ledgeroni.render import Renderer
+from ledgeroni.util import head_and_tail
+from ledgeroni.commands.errors import (build_filter_query,
+                                        exit_if_unbalanced)
 
 
-def build_table(transaction, postings):
+# Visible widths of the description and account columns
+DESCRIPTION_WIDTH = 56
+ACCOUNT_WIDTH = 41
+NO_TOTALS = ['{:>20}'.format('0')]
+
+
+def build_table(transaction, rows, renderer):
     "Generates the register table line by line"
-    # This whole thing stinks, fix it
-    line = [''] * 4
-
-    line[0] = (transaction.date_str + ' ' + Style.BRIGHT +
-               transaction.description + Style.RESET_ALL)
-    for posting, amts in postings.items():
-        line[1] = Fore.BLUE + posting + Style.RESET_ALL
-
-        changes, totals = amts
-        changes = [format_amount(c, a) for c, a in changes.items()]
-        if totals:
-            totals = [format_amount(c, a) for c, a in totals.items()]
-        else:
-            totals = ['{:>20}'.format('0')]
+    r = renderer
+    date_str = transaction.date_str
+    first = date_str + ' ' + r.pad(r.bright, transaction.description,
+                                   DESCRIPTION_WIDTH - len(date_str) - 1)
+    blank_first = r.pad(r.bright, '', DESCRIPTION_WIDTH)
+    blank_account = r.pad(r.blue, '', ACCOUNT_WIDTH)
+    for row in rows:
+        account = r.pad(r.blue, row.account_name, ACCOUNT_WIDTH)
+        changes = [r.formatter(c)(a) for c, a in row.changes]
+        totals = [r.formatter(c)(a) for c, a in row.totals] or NO_TOTALS
         for change, total in itertools.zip_longest(changes, totals,
                                                    fillvalue=' ' * 20):
-            line[2], line[3] = change, total
-            yield tuple(line)
-            line[0] = Style.BRIGHT + Style.RESET_ALL
-            line[1] = Fore.BLUE + Style.RESET_ALL
+            yield ' '.join((first, account, change, total))
+            first, account = blank_first, blank_account
+
+
+def dict_rows(report):
+    "Register rows of a report like `Journal.generate_running_total_report`"
+    for transaction, postings in report:
+        yield transaction, [
+            RegisterRow(name, list(changes.items()), list(totals.items()))
+            for name, (changes, totals) in postings.items()]
+
+
+def limit_rows(report, head=None, tail=None):
+    """
+    Keeps the first `head` and then the last `tail` rows of a register
+    report, grouped back into their transactions
+    """
+    rows = ((number, transaction, row)
+            for number, (transaction, rows) in enumerate(report)
+            for row in rows)
+    rows = head_and_tail(rows, head, tail)
+    for _, group in itertools.groupby(rows, key=lambda entry: entry[0]):
+        group = list(group)
+        yield group[0][1], [row for _, _, row in group]
+
+
+def journal_rows(ctx, engine, filter_query, filenames):
+    "Register rows of the journal, loaded all at once"
+    journal = Journal()
+    journal.add_from_files(filenames, cache=ctx.obj.get('CACHE', None),
+                           jobs=ctx.obj.get('JOBS', 1))
+
+    exit_if_unbalanced(journal.verify_transaction_balances())
+
+    sorter = ctx.obj.get('SORTER', None)
+    if sorter:
+        sorter.sort_journal(journal)
+
+    filter_query = Planner(journal).plan(filter_query)
+
+    if engine == 'cumulative':
+        frame = JournalFrame.from_journal(journal)
+        return generate_running_totals(frame, journal.transactions,
+                                       filter_query,
+                                       filter_query.candidates(journal))
+    return dict_rows(journal.generate_running_total_report(filter_query))
 
 
 @click.command()
+@click.option('--engine', type=click.Choice(['cumulative', 'dict']),
+              default='cumulative',
+              help='Compute running totals as cumulative sums over the '
+                   'journal columns (cumulative), or by updating a dict of '
+                   'totals (dict).')
+@click.option('--stream', is_flag=True,
+              help='Print rows as transactions are read instead of loading '
+                   'the journal first, always with the dict engine. '
+                   'Unbalanced transactions are reported at the end. Can\'t '
+                   'be used with --sort.')
+@click.option('--head', type=click.IntRange(min=0),
+              help='Only print the first N rows. Unless sorting, reading '
+                   'stops once they are printed, so later transactions are '
+                   'not checked for balance.')
+@click.option('--tail', type=click.IntRange(min=0),
+              help='Only print the last N rows.')
 @click.argument('filter_strs', nargs=-1)
 @click.pass_context
-def print_register(ctx, filter_strs):
+def print_register(ctx, engine, stream, head, tail, filter_strs):
     "The `ledgeroni print` subcommand"
-    filter_query = MATCH_ALL
-    if filter_strs:
-        filter_query = expression.build_expression(' '.join(filter_strs))
-    sorter = ctx.obj.get('SORTER', None)
-
-    journal = Journal()
+    filter_query = build_filter_query(ctx, filter_strs)
 
+    filenames = list(ctx.obj.get('LEDGER_FILES', []))
     price_db = ctx.obj.get('PRICE_DB', None)
     if price_db:
-        journal.add_from_file(price_db)
+        filenames.insert(0, price_db)
 
-    for filename in ctx.obj.get('LEDGER_FILES', []):
-        journal.add_from_file(filename)
+    sorter = ctx.obj.get('SORTER', None)
+    if stream and sorter:
+        raise click.UsageError('--stream can\'t be used with --sort')
 
-    errors = journal.verify_transaction_balances()
-    if errors:
-        for error in errors:
-            errstr = 'ERROR! Transaction unbalanced: {}'.format(error.header)
-            click.echo(errstr, err=True)
-        sys.exit(1)
+    errors = []
+    # Without sorting, the first rows don't need the rest of the journal
+    if stream or (head is not None and not sorter):
+        report = dict_rows(running_total_report(
+            read_transactions(filenames, errors), filter_query))
+    else:
+        report = journal_rows(ctx, engine, filter_query, filenames)
+    if head is not None or tail is not None:
+        report = limit_rows(report, head, tail)
 
-    if sorter:
-        sorter.sort_journal(journal)
+    # Streamed rows are written as they come instead of in large chunks
+    with Renderer(color=ctx.obj.get('COLOR'),
+                  line_buffered=stream or None) as renderer:
+        for transaction, rows in report:
+            for line in build_table(transaction, rows, renderer):
+                renderer.write(line)
+            renderer.end_entry()
 
-    for transaction, postings in journal.generate_running_total_report(filter_query):
-        for trans, post, change, total in build_table(transaction, postings):
-            click.echo('{:<64} {:<50} {} {}'.format(
-                trans, post, change, total))
+    exit_if_unbalanced(errors)
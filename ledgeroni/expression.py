@@ -1,9 +1,12 @@
 import re
 from collections import deque
+from datetime import timedelta
 
-from ledgeroni.query import RegexQuery, Or, Not, And, PayeeQuery
+from ledgeroni.query import (RegexQuery, Or, Not, And, PayeeQuery, DateQuery,
+                             MATCH_ALL, parse_day)
 
 TOKEN_REGEX = re.compile(r'(?P<token>\(|\)|@|[^\s\(\)\@]+)')
+DATE_TERM_REGEX = re.compile(r'date(?P<op>>=|<=|<|>|=)(?P<date>.+)$')
 
 def tokenize_expression(expr_str):
     expr_str = expr_str.lstrip()
@@ -81,6 +84,10 @@ def build_expr_from_postfix(postfix_expr):
             if not isinstance(operand, RegexQuery):
                 raise ValueError
             operand_stack.append(PayeeQuery(operand))
+        elif DATE_TERM_REGEX.match(token):
+            match = DATE_TERM_REGEX.match(token)
+            operand_stack.append(
+                build_date_query(match.group('op'), match.group('date')))
         else:
             operand = RegexQuery.from_string(token)
             operand_stack.append(operand)
@@ -91,3 +98,31 @@ def build_expr_from_postfix(postfix_expr):
     return operand_stack[0]
 
 
+def build_date_query(op, datestr):
+    try:
+        day = parse_day(datestr)
+    except ValueError:
+        raise ValueError('invalid date: {}'.format(datestr)) from None
+    next_day = day + timedelta(days=1)
+    if op == '>=':
+        return DateQuery(begin=day)
+    if op == '>':
+        return DateQuery(begin=next_day)
+    if op == '<=':
+        return DateQuery(end=next_day)
+    if op == '<':
+        return DateQuery(end=day)
+    return DateQuery(begin=day, end=next_day)
+
+
+def build_filter_query(filter_strs, begin=None, end=None):
+    queries = []
+    if begin is not None or end is not None:
+        queries.append(DateQuery(begin=begin, end=end))
+    if filter_strs:
+        queries.append(build_expression(' '.join(filter_strs)))
+    if not queries:
+        return MATCH_ALL
+    if len(queries) == 1:
+        return queries[0].compile()
+    return And(tuple(queries)).compile()
@@ -0,0 +1,291 @@
+"""
+frame.py: columnar representation of the postings of a journal
+
+A `JournalFrame` keeps one row per posting and commodity in parallel columns,
+so reports can scan arrays instead of walking transaction objects. Postings
+that balance their transaction are stored with their computed amounts and
+flagged in the `auto` column. Amounts are integers scaled by a power of ten
+that is fixed for each commodity, see `JournalFrame.scales`.
+
+The columns are NumPy arrays if NumPy is installed, or else `array.array`s.
+Amounts that don't fit in 64 bits are kept as Python ints either way.
+"""
+from __future__ import annotations
+import array
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from arrow.arrow import Arrow
+
+from ledgeroni import parser
+from ledgeroni.amount import Amount
+from ledgeroni.interning import InternTable
+from ledgeroni.journal import Journal
+from ledgeroni.query import Query, MATCH_ALL
+from ledgeroni.types import Commodity, Posting, Transaction
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# Commodity id of the row of a posting without any amount
+NO_COMMODITY = -1
+# Directives that have no rows in a frame
+SKIPPED_LINES = (parser.PRICE_LINE, parser.IGNORE_SYMBOL_LINE,
+                 parser.DEFAULT_COMMODITY_LINE)
+
+
+def int_column(values: List[int]) -> Sequence[int]:
+    "Packs integers into the most compact column available"
+    if numpy is not None:
+        try:
+            return numpy.array(values, dtype=numpy.int64)
+        except OverflowError:
+            return numpy.array(values, dtype=object)
+    try:
+        return array.array('q', values)
+    except OverflowError:
+        return values
+
+
+def bool_column(values: List[bool]) -> Sequence[bool]:
+    "Packs booleans into a column"
+    if numpy is not None:
+        return numpy.array(values, dtype=bool)
+    return array.array('b', values)
+
+
+def scaled_value(amount) -> Tuple[int, int]:
+    "Returns `(value, scale)` such that `amount == value / 10 ** scale`"
+    if isinstance(amount, Amount):
+        return amount.value, amount.scale
+    if isinstance(amount, int):
+        return amount, 0
+    raise ValueError('not a decimal amount: {!r}'.format(amount))
+
+
+@dataclass
+class JournalFrame:
+    """
+    The postings of a journal as columns. Every posting has at least one row,
+    with `NO_COMMODITY` if it has no amounts, and the rows of the transaction
+    at index `i` are the ones from `offsets[i]` to `offsets[i + 1]`.
+    Transactions themselves are kept in the `dates` and `descriptions` side
+    tables, and accounts and commodities are ids into `names`.
+    """
+    names: InternTable
+    dates: List[Arrow]
+    descriptions: List[str]
+    offsets: Sequence[int]
+    trans: Sequence[int]
+    posting: Sequence[int]
+    date: Sequence[int]
+    account: Sequence[int]
+    commodity: Sequence[int]
+    amount: Sequence[int]
+    auto: Sequence[bool]
+    scales: List[int]
+
+    def __len__(self) -> int:
+        return len(self.trans)
+
+    @classmethod
+    def from_journal(cls, journal: Journal) -> JournalFrame:
+        "Builds a frame with the transactions of a journal"
+        builder = FrameBuilder(journal.names)
+        for transaction in journal.transactions:
+            builder.add_transaction(transaction.date, transaction.description)
+            balanced = transaction.calc_totals()
+            for posting, filled in zip(transaction.postings,
+                                       balanced.postings):
+                builder.add_posting(posting.account, filled.amount_items(),
+                                    auto=posting.is_auto)
+        return builder.finish()
+
+    @classmethod
+    def from_tokens(cls, tokens: Iterable[Tuple[str, str]],
+                    names: InternTable = None) -> JournalFrame:
+        """
+        Builds a frame straight from scanner tokens, without building
+        posting objects. Only transactions are kept, other directives are
+        skipped.
+        """
+        names = InternTable() if names is None else names
+        builder = FrameBuilder(names)
+        in_transaction = False
+        for kind, line in tokens:
+            if kind == parser.POSTING_LINE:
+                if not in_transaction:
+                    raise ValueError
+                account, amount, commodity = parser.read_posting_fields(
+                    line, names)
+                amounts = None if amount is None else ((commodity, amount),)
+                builder.add_posting(account, amounts)
+                continue
+            in_transaction = kind == parser.TRANSACTION_LINE
+            if in_transaction:
+                header = parser.read_transaction_line(line)
+                builder.add_transaction(header.date, header.description)
+            elif kind not in SKIPPED_LINES:
+                raise ValueError
+        return builder.finish()
+
+    @classmethod
+    def from_file(cls, filename: str,
+                  names: InternTable = None) -> JournalFrame:
+        "Builds a frame from a journal file, see `from_tokens`"
+        return cls.from_tokens(parser.scan_file(filename), names)
+
+    def amount_at(self, row: int) -> Amount:
+        "The amount of a row, in its commodity"
+        scale = self.scales[self.commodity[row]]
+        return Amount(int(self.amount[row]), scale)
+
+    def transaction(self, index: int) -> Transaction:
+        "Builds the transaction at `index` back from its rows"
+        transaction = Transaction(date=self.dates[index],
+                                  description=self.descriptions[index])
+        row, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        while row < end:
+            posting = self.posting[row]
+            account = self.names.accounts[self.account[row]]
+            auto = bool(self.auto[row])
+            amounts = {}
+            while row < end and self.posting[row] == posting:
+                commodity = self.commodity[row]
+                if commodity != NO_COMMODITY:
+                    amounts[self.names.commodities[commodity]] = (
+                        self.amount_at(row))
+                row += 1
+            transaction.add_posting(Posting(account=account,
+                                            amounts=None if auto else amounts))
+        return transaction
+
+    def transactions(self) -> Iterator[Transaction]:
+        "Builds all transactions back from the rows"
+        return (self.transaction(i) for i in range(len(self.dates)))
+
+    def match_rows(self, query: Query,
+                   transactions: Sequence[Transaction] = None,
+                   candidates: Sequence[int] = None) -> Sequence[bool]:
+        """
+        Marks the rows of the postings that `query` matches. Queries run on
+        `transactions`, which have to be the ones the frame was built from,
+        and are rebuilt from the rows if not given. Only the transactions at
+        `candidates` are looked at if given, see `Query.candidates`.
+        """
+        if query is MATCH_ALL:
+            return bool_column([True] * len(self))
+        if transactions is None:
+            transactions = list(self.transactions())
+        if candidates is None:
+            candidates = range(len(transactions))
+        mask = [False] * len(self)
+        offsets, posting = self.offsets.tolist(), self.posting.tolist()
+        for index in candidates:
+            matched = query.execute_mask(transactions[index])
+            if matched:
+                for row in range(offsets[index], offsets[index + 1]):
+                    if matched >> posting[row] & 1:
+                        mask[row] = True
+        return bool_column(mask)
+
+
+@dataclass
+class FrameBuilder:
+    """
+    Collects rows one transaction at a time and packs them into a
+    `JournalFrame`. Amounts of postings that balance their transaction are
+    computed when the next transaction starts.
+    """
+    names: InternTable
+    dates: List[Arrow] = field(default_factory=list)
+    descriptions: List[str] = field(default_factory=list)
+    offsets: List[int] = field(default_factory=list)
+    trans: List[int] = field(default_factory=list)
+    posting: List[int] = field(default_factory=list)
+    date: List[int] = field(default_factory=list)
+    account: List[int] = field(default_factory=list)
+    commodity: List[int] = field(default_factory=list)
+    values: List[int] = field(default_factory=list)
+    value_scales: List[int] = field(default_factory=list)
+    auto: List[bool] = field(default_factory=list)
+    pending: List[Tuple[Tuple[str], Optional[Tuple], bool]] = field(
+        default_factory=list)
+
+    def add_transaction(self, date: Arrow, description: str):
+        "Starts a new transaction"
+        self.flush()
+        self.dates.append(date)
+        self.descriptions.append(description)
+        self.offsets.append(len(self.trans))
+
+    def add_posting(self, account: Tuple[str],
+                    amounts: Optional[Iterable[Tuple[Commodity, Amount]]],
+                    auto: bool = False):
+        """
+        Adds a posting with the given `(commodity, amount)` pairs to the
+        current transaction, or one that balances it if `amounts` is None.
+        `auto` marks a posting whose balancing amounts are already given.
+        """
+        self.pending.append(
+            (account, None if amounts is None else tuple(amounts), auto))
+
+    def flush(self):
+        "Writes the rows of the postings of the current transaction"
+        if not self.pending:
+            return
+        autos = sum(amounts is None for _, amounts, _ in self.pending)
+        if autos > 1:
+            raise ValueError
+        totals = defaultdict(Amount)
+        if autos:
+            for _, amounts, _ in self.pending:
+                for commodity, amount in amounts or ():
+                    totals[commodity] -= amount
+
+        index = len(self.dates) - 1
+        ordinal = self.dates[index].toordinal()
+        for number, (account, amounts, auto) in enumerate(self.pending):
+            if amounts is None:
+                auto = True
+                amounts = tuple(totals.items())
+            account_id = self.names.account_id(account)
+            for commodity, amount in amounts or ((None, 0),):
+                value, scale = scaled_value(amount)
+                self.trans.append(index)
+                self.posting.append(number)
+                self.date.append(ordinal)
+                self.account.append(account_id)
+                self.commodity.append(
+                    NO_COMMODITY if commodity is None
+                    else self.names.commodity_id(commodity))
+                self.values.append(value)
+                self.value_scales.append(scale)
+                self.auto.append(auto)
+        self.pending.clear()
+
+    def finish(self) -> JournalFrame:
+        "Packs all rows into a frame"
+        self.flush()
+        # Each commodity uses the largest scale any of its amounts has
+        scales = [0] * len(self.names.commodities)
+        for commodity, scale in zip(self.commodity, self.value_scales):
+            if commodity != NO_COMMODITY and scale > scales[commodity]:
+                scales[commodity] = scale
+        amounts = [value if commodity == NO_COMMODITY
+                   or scale == scales[commodity]
+                   else value * 10 ** (scales[commodity] - scale)
+                   for commodity, value, scale in zip(
+                       self.commodity, self.values, self.value_scales)]
+
+        return JournalFrame(
+            names=self.names, dates=self.dates,
+            descriptions=self.descriptions,
+            offsets=int_column(self.offsets + [len(self.trans)]),
+            trans=int_column(self.trans), posting=int_column(self.posting),
+            date=int_column(self.date), account=int_column(self.account),
+            commodity=int_column(self.commodity), amount=int_column(amounts),
+            auto=bool_column(self.auto), scales=scales)
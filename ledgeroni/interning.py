@@ -0,0 +1,108 @@
+"""
+interning.py: canonical commodities and accounts for a journal
+
+Journals repeat a handful of commodities and a few hundred accounts across
+millions of postings. An `InternTable` hands out a single shared object for
+each distinct commodity and account, so equal values are stored once and are
+usually found in dicts by identity, without comparing them field by field.
+Every distinct account and commodity also gets a small integer id, in first
+seen order.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from ledgeroni.types import Commodity, Posting, Transaction
+
+
+@dataclass
+class InternTable:
+    "Registry of the canonical commodities and accounts of a journal"
+    prefix_commodities: Dict[str, Commodity] = field(default_factory=dict)
+    suffix_commodities: Dict[str, Commodity] = field(default_factory=dict)
+    account_names: Dict[str, Tuple[str]] = field(default_factory=dict)
+    account_ids: Dict[Tuple[str], int] = field(default_factory=dict)
+    accounts: List[Tuple[str]] = field(default_factory=list)
+    commodity_ids: Dict[Commodity, int] = field(default_factory=dict)
+    commodities: List[Commodity] = field(default_factory=list)
+    prefixes: Dict[Tuple[str], List[Tuple[str]]] = field(default_factory=dict)
+
+    def commodity(self, name: str, is_prefix: bool = False) -> Commodity:
+        "Returns the canonical commodity with the given name and position"
+        table = (self.prefix_commodities if is_prefix
+                 else self.suffix_commodities)
+        commodity = table.get(name)
+        if commodity is None:
+            commodity = table[name] = Commodity(name=name, is_prefix=is_prefix)
+        return commodity
+
+    def intern_commodity(self, commodity: Commodity) -> Commodity:
+        "Returns the canonical commodity equal to `commodity`"
+        if commodity.__class__ is not Commodity:
+            # The integer commodity is already a singleton
+            return commodity
+        table = (self.prefix_commodities if commodity.is_prefix
+                 else self.suffix_commodities)
+        return table.setdefault(commodity.name, commodity)
+
+    def account(self, name: str) -> Tuple[str]:
+        "Returns the canonical account for a full account name like `A:B`"
+        account = self.account_names.get(name)
+        if account is None:
+            account = self.intern_account(tuple(name.split(':')))
+            self.account_names[name] = account
+        return account
+
+    def intern_account(self, account: Tuple[str]) -> Tuple[str]:
+        "Returns the canonical account equal to `account`"
+        return self.accounts[self.account_id(account)]
+
+    def account_prefixes(self, account: Tuple[str]) -> List[Tuple[str]]:
+        "Returns the canonical ancestors of an account, and the account"
+        prefixes = self.prefixes.get(account)
+        if prefixes is None:
+            prefixes = [self.intern_account(account[:depth])
+                        for depth in range(1, len(account))]
+            prefixes.append(self.intern_account(account))
+            self.prefixes[account] = prefixes
+        return prefixes
+
+    def account_id(self, account: Tuple[str]) -> int:
+        "Returns the integer id of an account, registering it if it's new"
+        account_id = self.account_ids.get(account)
+        if account_id is None:
+            account_id = len(self.accounts)
+            self.account_ids[account] = account_id
+            self.accounts.append(account)
+        return account_id
+
+    def commodity_id(self, commodity: Commodity) -> int:
+        "Returns the integer id of a commodity, registering it if it's new"
+        commodity_id = self.commodity_ids.get(commodity)
+        if commodity_id is None:
+            commodity_id = len(self.commodities)
+            self.commodity_ids[commodity] = commodity_id
+            self.commodities.append(commodity)
+        return commodity_id
+
+    def intern_posting(self, posting: Posting) -> Posting:
+        """
+        Returns `posting` if its account and commodities are already
+        canonical, or else an equal posting that uses the canonical ones
+        """
+        account = self.intern_account(posting.account)
+        if account is posting.account and all(
+                self.intern_commodity(c) is c
+                for c, _ in posting.amount_items()):
+            return posting
+        amounts = posting.amounts
+        if amounts:
+            amounts = {self.intern_commodity(c): a for c, a in amounts.items()}
+        return Posting(account=account, amounts=amounts)
+
+    def intern_transaction(self, transaction: Transaction):
+        "Makes all postings of a transaction use canonical values, in place"
+        postings = transaction.postings
+        for i, posting in enumerate(postings):
+            interned = self.intern_posting(posting)
+            if interned is not posting:
+                postings[i] = interned
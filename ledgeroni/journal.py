@@ -2,11 +2,18 @@
 journal.py: Defines an abstraction for a ledger journal and common operations
 on them
 """
+import itertools
+import re
+from bisect import bisect_left
 from collections import defaultdict
-from fractions import Fraction
 from dataclasses import dataclass, field
-from typing import List, Set, Tuple, Iterator, Dict
-from ledgeroni import parser
+from datetime import date
+from typing import List, Set, Tuple, Iterator, Iterable, Dict, Optional
+from ledgeroni import parser, parallel
+from ledgeroni.amount import Amount
+from ledgeroni.cache import ParseCache
+from ledgeroni.interning import InternTable
+from ledgeroni.payees import PayeeIndex
 from ledgeroni.types import (Transaction, Commodity, Price,
                              IgnoreSymbol, DefaultCommodity)
 from ledgeroni.query import Query
@@ -21,49 +28,173 @@ class Journal:
     prices: List[Price] = field(default_factory=list)
     default_commodity: Commodity = None
     ignored_symbols: List[str] = field(default_factory=list)
+    names: InternTable = field(default_factory=InternTable)
+    # Positions in `transactions` of the transactions with a posting to each
+    # account or to any of its subaccounts, in ascending order
+    account_index: Dict[Tuple[str], List[int]] = field(default_factory=dict)
+    payees: PayeeIndex = field(default_factory=PayeeIndex)
+    # Day ordinal and position of every transaction, sorted when searched
+    date_index: List[Tuple[int, int]] = field(default_factory=list)
+    dates_sorted: bool = True
+    # Number of transactions indexed. Only added transactions are noticed, so
+    # `rebuild_index` has to be called after `transactions` is reordered.
+    indexed: int = 0
 
     def add_transaction(self, transaction: Transaction):
-        "Adds and indexes a transaction."
+        """
+        Adds and indexes a transaction, filling in its implicit amounts and
+        checking its balance
+        """
+        self.names.intern_transaction(transaction)
+        transaction.settle()
         self.transactions.append(transaction)
         self.accounts.update(p.account for p in transaction.postings)
         self.commodities.update(c for p in transaction.postings
-                                if p.amounts for c in p.amounts)
+                                for c, _ in p.amount_items())
+        if self.indexed == len(self.transactions) - 1:
+            self.index_transaction(self.indexed, transaction)
+            self.indexed += 1
+
+    def index_transaction(self, position: int, transaction: Transaction):
+        "Adds the transaction at `position` to the indexes"
+        self.payees.add(transaction.description, position)
+        entry = (transaction.date.toordinal(), position)
+        if self.date_index and entry < self.date_index[-1]:
+            self.dates_sorted = False
+        self.date_index.append(entry)
+        index = self.account_index
+        for posting in transaction.postings:
+            for account in self.names.account_prefixes(posting.account):
+                positions = index.get(account)
+                if positions is None:
+                    index[account] = [position]
+                elif positions[-1] != position:
+                    positions.append(position)
+
+    def rebuild_index(self):
+        """
+        Indexes the transactions again, which is needed after they are
+        reordered, removed or changed in place, as the indexes can't tell
+        """
+        self.account_index = {}
+        self.payees = PayeeIndex()
+        self.date_index = []
+        self.dates_sorted = True
+        for position, transaction in enumerate(self.transactions):
+            self.index_transaction(position, transaction)
+        self.indexed = len(self.transactions)
+
+    def transactions_with_accounts(
+            self, accounts: Iterable[Tuple[str]]) -> List[int]:
+        """
+        Returns the positions of the transactions with a posting to any of
+        `accounts`, in ascending order. When every account of the journal
+        under some ancestor is given, the ancestor's entry is used instead of
+        merging theirs.
+        """
+        if self.indexed != len(self.transactions):
+            self.rebuild_index()
+        accounts = set(accounts)
+        total = defaultdict(int)
+        selected = defaultdict(int)
+        for account in self.accounts:
+            for prefix in self.names.account_prefixes(account):
+                total[prefix] += 1
+                if account in accounts:
+                    selected[prefix] += 1
+        covering = set()
+        for account in accounts & self.accounts:
+            for prefix in self.names.account_prefixes(account):
+                if selected[prefix] == total[prefix]:
+                    covering.add(prefix)
+                    break
+        lists = [self.account_index[prefix] for prefix in covering]
+        if len(lists) == 1:
+            return list(lists[0])
+        return sorted(set().union(*lists))
 
-    def add_from_file(self, filename: str):
-        "Loads all objects from a journal file"
-        for result in parser.read_file(filename):
+    def transactions_with_payee(self, regex: re.Pattern) -> List[int]:
+        """
+        Returns the positions of the transactions whose description `regex`
+        matches, in ascending order
+        """
+        if self.indexed != len(self.transactions):
+            self.rebuild_index()
+        return self.payees.matching(regex)
+
+    def transactions_between(self, begin: Optional[date],
+                             end: Optional[date]) -> List[int]:
+        """
+        Returns the positions of the transactions dated from `begin` up to,
+        but not including, `end`, in ascending order. Either bound may be
+        None.
+        """
+        if self.indexed != len(self.transactions):
+            self.rebuild_index()
+        if not self.dates_sorted:
+            self.date_index.sort()
+            self.dates_sorted = True
+        index = self.date_index
+        low = 0 if begin is None else bisect_left(index, (begin.toordinal(),))
+        high = (len(index) if end is None
+                else bisect_left(index, (end.toordinal(),)))
+        return sorted(position for _, position in index[low:high])
+
+    def candidates(self, query: Query) -> Iterable[Transaction]:
+        """
+        Returns the transactions that `query` could match, in order, skipping
+        the ones the index rules out
+        """
+        positions = query.candidates(self)
+        if positions is None:
+            return self.transactions
+        return (self.transactions[i] for i in positions)
+
+    def add_results(self, results: Iterable):
+        "Adds all objects generated by the parser"
+        for result in results:
             if isinstance(result, Transaction):
                 self.add_transaction(result)
             elif isinstance(result, DefaultCommodity):
-                self.default_commodity = result.commodity
+                self.default_commodity = self.names.intern_commodity(
+                    result.commodity)
             elif isinstance(result, IgnoreSymbol):
                 self.ignored_symbols.append(result.symbol)
             elif isinstance(result, Price):
                 self.prices.append(result)
 
+    def add_from_file(self, filename: str, cache: ParseCache = None,
+                      jobs: int = 1):
+        "Loads all objects from a journal file, see `add_from_files`"
+        self.add_from_files([filename], cache=cache, jobs=jobs)
+
+    def add_from_files(self, filenames: Iterable[str],
+                       cache: ParseCache = None, jobs: int = 1):
+        """
+        Loads all objects from the given journal files in order, going through
+        `cache` if one is given, or else loading with up to `jobs` processes
+        """
+        if cache is not None:
+            results = itertools.chain.from_iterable(
+                cache.read_file(filename) for filename in filenames)
+        elif jobs > 1:
+            results = parallel.read_files(filenames, jobs)
+        else:
+            results = itertools.chain.from_iterable(
+                parser.read_file(filename, names=self.names)
+                for filename in filenames)
+        self.add_results(results)
+
     def generate_running_total_report(
             self, query: Query) -> Iterator[Tuple[Transaction, Dict]]:
         """
         Generates a running total from the transactions stored in the journal.
         """
-        totals = defaultdict(Fraction)
-
-        for transaction in self.transactions:
-            if not query.execute(transaction):
-                continue
-            transaction = transaction.calc_totals()
-            trans_total = {}
-            for posting in transaction.postings:
-                for commodity, amount in posting.amounts.items():
-                    totals[commodity] += amount
-                posting_total = {c: a for c, a in totals.items() if a != 0}
-                total = (posting.amounts, posting_total)
-                trans_total[posting.account_name] = total
-            yield transaction, trans_total
+        return running_total_report(self.candidates(query), query)
 
     def transactions_matching(self, query: Query) -> Iterator[Transaction]:
         "Returns this journals transactions filtered by a query"
-        return (t for t in self.transactions if query.execute(t))
+        return (t for t in self.candidates(query) if query.matches(t))
 
     def verify_transaction_balances(self) -> List[Transaction]:
         errors = []
@@ -72,3 +203,26 @@ class Journal:
                 errors.append(transaction)
 
         return errors
+
+
+def running_total_report(
+        transactions: Iterable[Transaction],
+        query: Query) -> Iterator[Tuple[Transaction, Dict]]:
+    """
+    Generates a running total from the transactions that `query` matches,
+    looking at each of them once, see `Journal.generate_running_total_report`
+    """
+    totals = defaultdict(Amount)
+
+    for transaction in transactions:
+        if not query.matches(transaction):
+            continue
+        transaction = transaction.calc_totals()
+        trans_total = {}
+        for posting in transaction.postings:
+            for commodity, amount in posting.amount_items():
+                totals[commodity] += amount
+            posting_total = {c: a for c, a in totals.items() if a != 0}
+            total = (posting.amounts, posting_total)
+            trans_total[posting.account_name] = total
+        yield transaction, trans_total
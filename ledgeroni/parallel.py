@@ -0,0 +1,112 @@
+"""
+parallel.py: loads journal files using multiple threads and processes
+
+Files are read in a thread pool, which also looks for `include` directives so
+included files start loading right away. Parsing happens in a process pool,
+with large files split into byte ranges that start at non-indented lines, so
+no transaction is split between two ranges. Every file is parsed with its
+`include` directives kept as `Include` objects, and these are expanded in the
+order the directives appear, which keeps the semantics of order dependent
+directives like `P`, `N` and `D`.
+"""
+import os
+import threading
+from concurrent.futures import (Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from ledgeroni import parser
+from ledgeroni.interning import InternTable
+from ledgeroni.types import Include
+
+# Files are not split in ranges smaller than this
+MIN_CHUNK_SIZE = 1 << 20
+# Number of ranges given to each worker, to even out uneven ranges
+CHUNKS_PER_JOB = 4
+IO_THREADS = 4
+
+
+def split_buffer(data: bytes, chunks: int) -> List[Tuple[int, int]]:
+    """
+    Splits `data` into at most `chunks` byte ranges that all start at the
+    beginning of a journal entry
+    """
+    size = len(data)
+    chunks = max(1, min(chunks, size // MIN_CHUNK_SIZE))
+    offsets = sorted({parser.next_entry_offset(data, size * i // chunks)
+                      for i in range(1, chunks)} | {0, size})
+    return list(zip(offsets, offsets[1:]))
+
+
+def parse_buffer(data: bytes, cwd: str) -> List:
+    "Parses a journal buffer, keeping `include` directives as `Include`s"
+    tokens = parser.scan_buffer(data, cwd, follow_includes=False)
+    return list(parser.read_tokens(tokens, InternTable()))
+
+
+class FileLoader:
+    """
+    Schedules the reading and parsing of journal files and puts their results
+    back together
+    """
+    def __init__(self, threads: Executor, processes: Executor, jobs: int):
+        self.threads = threads
+        self.processes = processes
+        self.jobs = jobs
+        self.files: Dict[str, Future] = {}
+        self.expanded: Set[str] = set()
+        self.lock = threading.Lock()
+
+    def schedule(self, filename: str):
+        "Starts loading `filename` unless it was already scheduled"
+        with self.lock:
+            if filename in self.files:
+                return
+            self.files[filename] = self.threads.submit(self.load, filename)
+
+    def load(self, filename: str) -> List[Future]:
+        """
+        Reads a file, schedules its includes and submits its ranges for
+        parsing
+        """
+        with open(filename, 'rb') as filep:
+            data = filep.read()
+        cwd = os.path.dirname(filename)
+        for included in parser.find_includes(data, cwd):
+            self.schedule(included)
+        ranges = split_buffer(data, self.jobs * CHUNKS_PER_JOB)
+        if len(ranges) == 1:
+            return [self.processes.submit(parse_buffer, data, cwd)]
+        return [self.processes.submit(parse_buffer, data[start:end], cwd)
+                for start, end in ranges]
+
+    def read_file(self, filename: str) -> Iterator:
+        "Generates the journal objects of a file, following its includes"
+        self.schedule(filename)
+        futures = self.files[filename].result()
+        if filename in self.expanded:
+            # Parsed again, so every include gets its own objects like it
+            # does when reading sequentially
+            futures = self.load(filename)
+        self.expanded.add(filename)
+        for future in futures:
+            for entry in future.result():
+                if isinstance(entry, Include):
+                    yield from self.read_file(entry.filename)
+                else:
+                    yield entry
+
+
+def read_files(filenames: Iterable[str], jobs: int) -> Iterator:
+    """
+    Generates the journal objects of the files with the given filenames, in
+    order, like `parser.read_file`, parsing with up to `jobs` processes
+    """
+    filenames = list(filenames)
+    with ThreadPoolExecutor(max_workers=IO_THREADS) as threads, \
+            ProcessPoolExecutor(max_workers=jobs) as processes:
+        loader = FileLoader(threads, processes, jobs)
+        for filename in filenames:
+            loader.schedule(filename)
+        for filename in filenames:
+            yield from loader.read_file(filename)
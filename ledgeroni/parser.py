@@ -12,14 +12,20 @@ ommisions include:
 
 
 """
-from typing import Iterator, Tuple
-from fractions import Fraction
+from typing import Iterator, List, Optional, Tuple
+import contextlib
+import functools
+import mmap
 import re
 import os
 import arrow
+from arrow.arrow import Arrow
 
+from ledgeroni.amount import Amount
+from ledgeroni.interning import InternTable
 from ledgeroni.types import (Transaction, Posting, Commodity, Price,
-                             IgnoreSymbol, DefaultCommodity, INTEGER_COMMODITY)
+                             IgnoreSymbol, DefaultCommodity, Include,
+                             INTEGER_COMMODITY)
 
 
 def load_lines(filename: str) -> Iterator[str]:
@@ -50,18 +56,185 @@ def remove_empty_lines(iterator: Iterator[str]) -> Iterator[str]:
     return (line for line in iterator if line)
 
 
+# Kinds of lines recognized by the scanner
+BLANK_LINE = 'blank'
+INCLUDE_LINE = 'include'
+TRANSACTION_LINE = 'transaction'
+POSTING_LINE = 'posting'
+PRICE_LINE = 'price'
+IGNORE_SYMBOL_LINE = 'ignore_symbol'
+DEFAULT_COMMODITY_LINE = 'default_commodity'
+UNKNOWN_LINE = 'unknown'
+
+LINE_KINDS = {' ': POSTING_LINE, '\t': POSTING_LINE, 'P': PRICE_LINE,
+              'N': IGNORE_SYMBOL_LINE, 'D': DEFAULT_COMMODITY_LINE}
+LINE_KINDS.update((digit, TRANSACTION_LINE) for digit in '0123456789')
+
+# Matches a line up to its last char that is neither whitespace nor part of a
+# comment, so blank and comment lines are skipped without being materialized
+CONTENT_RE = re.compile(rb'^[^\n;#%|*]*[^\s;#%|*]', re.M)
+INCLUDE_PREFIXES = (b'!include', b'include')
+INCLUDE_RE = re.compile(rb'^!?include[^\n]*', re.M)
+# First bytes of lines that start a journal entry rather than continue one
+ENTRY_STARTS = frozenset(bytes([c]) for c in range(0x21, 0x7f)
+                         if c not in b';#%|*')
+ENTRY_START_RE = re.compile(rb'^(?![;#%|*])[\x21-\x7e]', re.M)
+
+
+def classify_line(line: str) -> str:
+    "Returns the kind of a line that had its comments already removed"
+    if not line:
+        return BLANK_LINE
+    if line[0].isspace():
+        return POSTING_LINE
+    if line[0].isdigit():
+        return TRANSACTION_LINE
+    return LINE_KINDS.get(line[0], UNKNOWN_LINE)
+
+
+def include_paths(line: str, cwd: str) -> List[str]:
+    "Returns the paths of the files named by an `include` directive line"
+    return [filename if os.path.isabs(filename)
+            else os.path.join(cwd, filename)
+            for filename in line.split()[1:]]
+
+
+def find_includes(data: bytes, cwd: str = '') -> List[str]:
+    "Returns the paths of all files included by the journal in `data`"
+    return [filepath for match in INCLUDE_RE.finditer(data)
+            for filepath in include_paths(match.group().decode('utf-8'), cwd)]
+
+
+def scan_buffer(data: bytes, cwd: str = '', follow_includes: bool = True,
+                start: int = 0, end: int = None) -> Iterator[Tuple[str, str]]:
+    """
+    Tokenizes the raw contents of a journal in a single pass, yielding
+    `(kind, line)` pairs for every line with content. Comments are removed,
+    blank lines are skipped and `include` directives are followed, relative to
+    `cwd`. If `follow_includes` is false, an `INCLUDE_LINE` token with the
+    path of each included file is yielded instead. Only the bytes between
+    `start` and `end` are scanned, `start` has to be the start of a line.
+    """
+    if end is None:
+        end = len(data)
+    for match in CONTENT_RE.finditer(data, start, end):
+        content = match.group()
+        if content[0] in b'!i' and content.startswith(INCLUDE_PREFIXES):
+            line_end = data.find(b'\n', match.start(), end)
+            line = data[match.start():end if line_end < 0 else line_end]
+            for filepath in include_paths(line.decode('utf-8'), cwd):
+                if follow_includes:
+                    yield from scan_file(filepath)
+                else:
+                    yield INCLUDE_LINE, filepath
+            continue
+        line = content.decode('utf-8').rstrip()
+        if line:
+            yield LINE_KINDS.get(line[0]) or classify_line(line), line
+
+
+def next_entry_offset(data: bytes, start: int = 0) -> int:
+    """
+    Returns the offset of the first non-indented line with content in `data`
+    at or after `start`, or the length of `data` if there is none
+    """
+    match = ENTRY_START_RE.search(data, start)
+    return len(data) if match is None else match.start()
+
+
+def last_entry_offset(data: bytes, start: int = 0) -> int:
+    """
+    Returns the offset of the last non-indented line with content in `data`
+    after `start`, or `start` if there is none. No transaction is in progress
+    at such a line, so parsing can be split or resumed there.
+    """
+    line_end = len(data)
+    while line_end > start:
+        line_start = max(data.rfind(b'\n', start, line_end) + 1, start)
+        if data[line_start:line_start + 1] in ENTRY_STARTS:
+            return line_start
+        line_end = line_start - 1
+    return start
+
+
+@contextlib.contextmanager
+def map_file(filename: str) -> Iterator[bytes]:
+    "Maps the contents of the file at `filename` into memory, read only"
+    with open(filename, 'rb') as filep:
+        if os.fstat(filep.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(filep.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def scan_file(filename: str,
+              follow_includes: bool = True) -> Iterator[Tuple[str, str]]:
+    """
+    Tokenizes the journal file at `filename`, following any `include`
+    directives. The file is memory mapped, so only lines with content are
+    ever copied out of it. See `scan_buffer`.
+    """
+    with map_file(filename) as data:
+        yield from scan_buffer(data, os.path.dirname(filename),
+                               follow_includes)
+
+
+# Matches the `YYYY/MM/DD` and `YYYY-MM-DD` dates, with an optional time
+DATE_RE = re.compile(
+    r'(\d{4})([/-])(\d{1,2})\2(\d{1,2})(?: (\d{1,2}):(\d{2}):(\d{2}))?$')
+
+# Journals repeat a few thousand distinct dates across millions of records
+DATE_CACHE_SIZE = 8192
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(datestr: str) -> Arrow:
+    """
+    Parses a journal date, memoizing the result. Common formats are handled
+    directly, anything else is left to `arrow.get`.
+    """
+    match = DATE_RE.match(datestr)
+    if match is not None:
+        year, _, month, day, hour, minute, second = match.groups()
+        try:
+            if hour is None:
+                return Arrow(int(year), int(month), int(day))
+            return Arrow(int(year), int(month), int(day), int(hour),
+                         int(minute), int(second))
+        except ValueError:
+            pass
+    return arrow.get(datestr)
+
+
 def read_transaction_line(line: str) -> str:
     """
     Reads the line that begins a transaction and returns a new transaction
     object
     """
     date, description = line.split(maxsplit=1)
-    date = arrow.get(date)
+    date = parse_date(date)
     return Transaction(date=date, description=description)
 
 
-def read_posting_line(line: str) -> Posting:
-    "Reads a posting line and returns a Posting object"
+def read_posting_line(line: str, names: InternTable = None) -> Posting:
+    """
+    Reads a posting line and returns a Posting object, with its account and
+    commodity taken from `names` if given
+    """
+    account, amount, commodity = read_posting_fields(line, names)
+    amounts = None if amount is None else {commodity: amount}
+
+    return Posting(account=account, amounts=amounts)
+
+
+def read_posting_fields(
+        line: str, names: InternTable = None
+) -> Tuple[Tuple[str], Optional[Amount], Optional[Commodity]]:
+    """
+    Reads a posting line into its account, amount and commodity, the last two
+    being None if the posting has no amount. See `read_posting_line`.
+    """
     line = line.strip()
 
     # The account name ends once we find two spaces in a row
@@ -71,11 +244,12 @@ def read_posting_line(line: str) -> Posting:
             account, amount = line[0:i].strip(), line[i:].strip()
             break
 
-    account = tuple(account.split(':'))
-    amount, commodity = read_amount(amount)
-    amounts = None if amount is None else {commodity: amount}
-
-    return Posting(account=account, amounts=amounts)
+    if names is None:
+        account = tuple(account.split(':'))
+    else:
+        account = names.account(account)
+    amount, commodity = read_amount(amount, names)
+    return account, amount, commodity
 
 
 AMOUNT_RE = re.compile(
@@ -83,10 +257,11 @@ AMOUNT_RE = re.compile(
     r'(?P<suffix>[^.,\d-]*)')
 
 
-def read_amount(amtstr: str) -> Tuple[Fraction, Commodity]:
+def read_amount(amtstr: str,
+                names: InternTable = None) -> Tuple[Amount, Commodity]:
     """
     Reads in a journal formatted amount and returns the numerical amount
-    along with an associated commodity object
+    along with an associated commodity object, taken from `names` if given
     """
     if amtstr is None:
         return None, None
@@ -101,17 +276,21 @@ def read_amount(amtstr: str) -> Tuple[Fraction, Commodity]:
     if prefix and suffix:
         raise ValueError
 
-    multi = -1 if negation else 1
-    amount = Fraction(amount)
+    amount = Amount.from_string(amount)
+    if negation:
+        amount = -amount
     commodity = INTEGER_COMMODITY
-    if prefix:
-        commodity = Commodity(is_prefix=True, name=prefix)
-    if suffix:
-        commodity = Commodity(is_prefix=False, name=suffix)
-    return amount * multi, commodity
+    if prefix or suffix:
+        if names is not None:
+            commodity = names.commodity(prefix or suffix, bool(prefix))
+        elif prefix:
+            commodity = Commodity(is_prefix=True, name=prefix)
+        else:
+            commodity = Commodity(is_prefix=False, name=suffix)
+    return amount, commodity
 
 
-def read_price_line(line: str) -> Price:
+def read_price_line(line: str, names: InternTable = None) -> Price:
     """
     Reads a line that specifies a historical price in journal format and
     returns a Price object
@@ -120,10 +299,13 @@ def read_price_line(line: str) -> Price:
 
     _, date, time, source, amount = parts
 
-    src = Commodity(name=source)
-    rate, dest = read_amount(amount)
+    if names is None:
+        src = Commodity(name=source)
+    else:
+        src = names.commodity(source)
+    rate, dest = read_amount(amount, names)
 
-    price_date = arrow.get(date + ' ' + time)
+    price_date = parse_date(date + ' ' + time)
 
     return Price(timestamp=price_date, source=src, dest=dest, rate=rate)
 
@@ -134,35 +316,41 @@ def read_ignore_symbol_line(line: str) -> IgnoreSymbol:
     return IgnoreSymbol(symbol=symbol)
 
 
-def read_default_commodity_line(line: str) -> DefaultCommodity:
+def read_default_commodity_line(line: str,
+                                names: InternTable = None) -> DefaultCommodity:
     "Reads a line that specifies the default commodity"
     _, amount = line.split(maxsplit=1)
-    _, commodity = read_amount(amount)
+    _, commodity = read_amount(amount, names)
     return DefaultCommodity(commodity)
 
 
-def read_lines(iterator: Iterator[str]) -> Iterator:
+def read_tokens(tokens: Iterator[Tuple[str, str]],
+                names: InternTable = None) -> Iterator:
     """
-    Reads all lines from the iterator and builds and yields the journal
-    objects that are parsed
+    Reads all `(kind, line)` pairs from the iterator and builds and yields the
+    journal objects that are parsed. Commodities and accounts are interned in
+    `names` if given.
     """
     current_transaction = None
-    for line in iterator:
-        if line[0].isspace():
+    for kind, line in tokens:
+        if kind == POSTING_LINE:
             if not current_transaction:
                 raise ValueError
-            current_transaction.add_posting(read_posting_line(line))
+            current_transaction.add_posting(read_posting_line(line, names))
             continue
         if current_transaction is not None:
             yield current_transaction
-        if line[0].isdigit():
+            current_transaction = None
+        if kind == TRANSACTION_LINE:
             current_transaction = read_transaction_line(line)
-        elif line[0] == 'P':
-            yield read_price_line(line)
-        elif line[0] == 'N':
+        elif kind == PRICE_LINE:
+            yield read_price_line(line, names)
+        elif kind == IGNORE_SYMBOL_LINE:
             yield read_ignore_symbol_line(line)
-        elif line[0] == 'D':
-            yield read_default_commodity_line(line)
+        elif kind == DEFAULT_COMMODITY_LINE:
+            yield read_default_commodity_line(line, names)
+        elif kind == INCLUDE_LINE:
+            yield Include(filename=line)
         else:
             raise ValueError
 
@@ -170,12 +358,19 @@ def read_lines(iterator: Iterator[str]) -> Iterator:
         yield current_transaction
 
 
-def read_file(filename: str) -> Iterator:
+def read_lines(iterator: Iterator[str]) -> Iterator:
+    """
+    Reads all lines from the iterator and builds and yields the journal
+    objects that are parsed
+    """
+    return read_tokens((classify_line(line), line) for line in iterator)
+
+
+def read_file(filename: str, follow_includes: bool = True,
+              names: InternTable = None) -> Iterator:
     """
     Generates journal objects from the file at with the given filename,
-    following any `include` directives within
+    following any `include` directives within. If `follow_includes` is false,
+    `Include` objects are generated in their place. See `read_tokens`.
     """
-    iterator = load_lines(filename)
-    iterator = remove_comments(iterator)
-    iterator = remove_empty_lines(iterator)
-    yield from read_lines(iterator)
+    yield from read_tokens(scan_file(filename, follow_includes), names)
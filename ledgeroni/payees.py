@@ -0,0 +1,91 @@
+"""
+payees.py: index of transaction descriptions for payee queries
+
+Imported journals repeat the same few payees over and over. A `PayeeIndex`
+keeps every distinct description once, with the positions of the transactions
+that share it, so a payee regex is run once per description instead of once
+per transaction. When the regex is a plain string, descriptions are first
+narrowed down to the ones containing all of its trigrams.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+# Characters that make a regex more than a plain string
+SPECIAL_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+
+def trigrams(text: str) -> Set[str]:
+    "The substrings of length three of `text`"
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def required_literal(regex: re.Pattern) -> Optional[str]:
+    """
+    Returns the text every match of `regex` has to contain, lowercased, or
+    None if it is not a plain ASCII string
+    """
+    pattern = regex.pattern
+    if (not isinstance(pattern, str) or regex.flags & re.VERBOSE
+            or SPECIAL_CHARS.intersection(pattern) or not pattern.isascii()):
+        return None
+    return pattern.lower()
+
+
+@dataclass
+class PayeeIndex:
+    """
+    Positions of the transactions that share each description. Trigrams are
+    only indexed once the index is first searched.
+    """
+    positions: Dict[str, List[int]] = field(default_factory=dict)
+    trigrams: Dict[str, Set[str]] = field(default_factory=dict)
+    # Descriptions that are not ASCII, which regexes ignoring case can match
+    # in ways lowercasing them doesn't show, so they are always candidates
+    unindexed: List[str] = field(default_factory=list)
+    indexed: int = 0
+
+    def add(self, description: str, position: int):
+        "Records that the transaction at `position` has `description`"
+        positions = self.positions.get(description)
+        if positions is None:
+            self.positions[description] = [position]
+        else:
+            positions.append(position)
+
+    def index_trigrams(self):
+        "Indexes the trigrams of the descriptions added since the last call"
+        descriptions = list(self.positions)
+        for description in descriptions[self.indexed:]:
+            if not description.isascii():
+                self.unindexed.append(description)
+                continue
+            for trigram in trigrams(description.lower()):
+                found = self.trigrams.get(trigram)
+                if found is None:
+                    self.trigrams[trigram] = {description}
+                else:
+                    found.add(description)
+        self.indexed = len(descriptions)
+
+    def candidate_descriptions(self, regex: re.Pattern) -> Iterable[str]:
+        "Returns the descriptions `regex` could match"
+        literal = required_literal(regex)
+        if literal is None or len(literal) < 3:
+            return self.positions
+        self.index_trigrams()
+        found = sorted((self.trigrams.get(t, set())
+                        for t in trigrams(literal)), key=len)
+        return list(found[0].intersection(*found[1:])) + self.unindexed
+
+    def matching(self, regex: re.Pattern) -> List[int]:
+        """
+        Returns the positions of the transactions whose description `regex`
+        matches, in ascending order
+        """
+        search = regex.search
+        lists = [self.positions[d] for d in self.candidate_descriptions(regex)
+                 if search(d) is not None]
+        if len(lists) == 1:
+            return list(lists[0])
+        return sorted(p for positions in lists for p in positions)
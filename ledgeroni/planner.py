@@ -0,0 +1,153 @@
+"""
+planner.py: reorders the operands of filter queries by what they cost
+
+Compiled `And` and `Or` queries stop evaluating their operands as soon as the
+result for a posting is known, so the order of the operands matters. A
+`Planner` measures, for every leaf of a query, the share of postings it
+matches on a sample of the journal, and puts first the operands most likely to
+settle the result for the least work. The work of each kind of leaf is a fixed
+estimate rather than a timing, so plans are the same from one run to the next.
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from ledgeroni.journal import Journal
+from ledgeroni.query import (Query, And, Or, Not, RegexQuery, PayeeQuery,
+                             DateQuery, CompiledQuery, AlwaysTrueQuery,
+                             flatten)
+
+# Transactions a leaf is measured on, spread evenly across the journal
+SAMPLE_SIZE = 512
+# Work per posting of each kind of leaf, relative to an account regex, as
+# timed on generated journals
+LEAF_COSTS = {
+    RegexQuery: 1.0,
+    PayeeQuery: 2.0,
+    DateQuery: 2.5,
+    AlwaysTrueQuery: 0.0,
+}
+
+
+@dataclass
+class QueryStats:
+    """
+    Share of the postings a query matches and the work it takes per posting.
+    Estimated for `And` and `Or`, assuming their operands are independent.
+    """
+    rate: float
+    cost: float
+
+
+@dataclass
+class Planner:
+    "Plans queries to run on the transactions of a journal"
+    journal: Journal
+    stats: Dict[Query, QueryStats] = field(default_factory=dict)
+
+    def sample(self) -> List:
+        "The transactions leaves are measured on"
+        transactions = self.journal.transactions
+        step = max(1, len(transactions) // SAMPLE_SIZE)
+        return transactions[::step][:SAMPLE_SIZE]
+
+    def measure(self, query: Query) -> QueryStats:
+        "Runs a leaf on every posting of the sample to find its match rate"
+        pairs = [(trans, posting) for trans in self.sample()
+                 for posting in trans.postings]
+        if not pairs:
+            return QueryStats(rate=0.0, cost=0.0)
+        match = query.matcher()
+        matched = sum(1 for trans, posting in pairs if match(trans, posting))
+        return QueryStats(rate=matched / len(pairs), cost=leaf_cost(query))
+
+    def estimate(self, query: Query) -> QueryStats:
+        "Returns the statistics of a query, running operands in their order"
+        stats = self.stats.get(query)
+        if stats is not None:
+            return stats
+        if isinstance(query, (And, Or)):
+            # The share of postings that is still undecided
+            pending, cost = 1.0, 0.0
+            for operand in query.queries:
+                operand_stats = self.estimate(operand)
+                cost += pending * operand_stats.cost
+                if isinstance(query, And):
+                    pending *= operand_stats.rate
+                else:
+                    pending *= 1 - operand_stats.rate
+            rate = pending if isinstance(query, And) else 1 - pending
+            stats = QueryStats(rate=rate, cost=cost)
+        else:
+            stats = self.measure(query)
+        self.stats[query] = stats
+        return stats
+
+    def rank(self, query: Query, operator: type) -> float:
+        """
+        Orders the operands of `operator`: the work an operand takes for
+        each posting it settles the result of
+        """
+        stats = self.estimate(query)
+        settled = 1 - stats.rate if operator is And else stats.rate
+        if settled <= 0:
+            return math.inf
+        return stats.cost / settled
+
+    def plan(self, query: Query) -> Query:
+        """
+        Returns an equivalent query with its operands in the planned order.
+        Operands that rank the same keep the order they were given in.
+        """
+        if isinstance(query, CompiledQuery):
+            return self.plan(query.query).compile()
+        if isinstance(query, (And, Or)):
+            operator = type(query)
+            operands = [self.plan(q) for q in flatten(query, operator)]
+            operands.sort(key=lambda q: self.rank(q, operator))
+            return operator(tuple(operands))
+        if isinstance(query, Not):
+            return Not(self.plan(query.query))
+        return query
+
+    def explain(self, query: Query) -> List[str]:
+        "Describes how a planned query runs, one line per query of the tree"
+        if isinstance(query, CompiledQuery):
+            query = query.query
+        candidates = query.candidates(self.journal)
+        total = len(self.journal.transactions)
+        lines = ['visits {} of {} transactions'.format(
+            total if candidates is None else len(candidates), total)]
+        self.explain_query(query, 0, lines)
+        return lines
+
+    def explain_query(self, query: Query, depth: int, lines: List[str]):
+        "Adds the lines describing `query` and its operands to `lines`"
+        stats = self.estimate(query)
+        lines.append('{:<50} rate {:>6.1%}  cost {:>6.2f}'.format(
+            '  ' * depth + describe(query), stats.rate, stats.cost))
+        if isinstance(query, (And, Or)):
+            for operand in query.queries:
+                self.explain_query(operand, depth + 1, lines)
+        elif isinstance(query, Not):
+            self.explain_query(query.query, depth + 1, lines)
+
+
+def leaf_cost(query: Query) -> float:
+    "The work a query that isn't an `And` or `Or` takes per posting"
+    if isinstance(query, Not):
+        return leaf_cost(query.query)
+    return LEAF_COSTS.get(type(query), 1.0)
+
+
+def describe(query: Query) -> str:
+    "A short description of a single query, without its operands"
+    if isinstance(query, RegexQuery):
+        return 'account /{}/'.format(query.regex.pattern)
+    if isinstance(query, PayeeQuery):
+        return 'payee /{}/'.format(query.query.regex.pattern)
+    if isinstance(query, DateQuery):
+        return 'date [{}, {})'.format(query.begin or '', query.end or '')
+    if isinstance(query, AlwaysTrueQuery):
+        return 'everything'
+    return type(query).__name__.lower()
@@ -1,12 +1,23 @@
 """
 query.py Abstraction for filtering account names
 """
+from __future__ import annotations
 import re
-from dataclasses import dataclass
-from typing import Tuple, Iterable, Set, Iterator
+from datetime import date
+from dataclasses import dataclass, field
+from typing import (Callable, Dict, Tuple, Iterable, List, Set, Iterator,
+                    Optional, TYPE_CHECKING)
 
+from ledgeroni import parser
 from ledgeroni.types import Transaction, Posting
 
+if TYPE_CHECKING:  # pragma: no cover
+    from ledgeroni.journal import Journal
+
+# Decides whether a single posting of a transaction matches a query
+Matcher = Callable[[Transaction, Posting], bool]
+
+
 @dataclass(frozen=True)
 class Query:
     "Base abstract query class"
@@ -14,19 +25,90 @@ class Query:
     def execute(self, trans: Transaction) -> Set[Posting]:
         raise NotImplementedError
 
+    def execute_mask(self, trans: Transaction) -> int:
+        """
+        Runs the query on `trans`, returning the selected postings as a
+        bitmask where bit `i` is set if posting `i` matches
+        """
+        mask = 0
+        for i in self.execute(trans):
+            mask |= 1 << i
+        return mask
+
     def postings_matching(self, trans: Transaction) -> Iterator[Posting]:
-        return (trans.postings[i] for i in self.execute(trans))
+        postings = trans.postings
+        return (postings[i] for i in iter_bits(self.execute_mask(trans)))
+
+    def matches(self, trans: Transaction) -> bool:
+        "Whether the query matches any posting of `trans`"
+        return self.execute_mask(trans) != 0
+
+    def matcher(self) -> Matcher:
+        "Builds a function that runs the query on a single posting"
+        raise NotImplementedError
+
+    def compile(self) -> Query:
+        """
+        Returns an equivalent query that runs as a single function per
+        posting, without building sets along the way
+        """
+        return CompiledQuery(query=self, match=self.matcher())
+
+    def candidates(self, journal: Journal) -> Optional[List[int]]:
+        """
+        Returns the ascending positions in `journal.transactions` of the only
+        transactions the query could match, or None if it has to be run on
+        all of them
+        """
+        return None
 
 
 @dataclass(frozen=True)
 class RegexQuery(Query):
-    "Query to match a datum to a regular expression"
+    """
+    Query to match a datum to a regular expression. Journals have few
+    distinct accounts, so the result for each account is remembered in
+    `memo`, keyed by the account tuple.
+    """
     regex: re.Pattern
+    memo: Dict[Tuple[str], bool] = field(default_factory=dict, compare=False,
+                                         repr=False)
+
+    def matches_account(self, account: Tuple[str]) -> bool:
+        "Whether the regex matches the full name of `account`"
+        matched = self.memo.get(account)
+        if matched is None:
+            matched = self.regex.search(':'.join(account)) is not None
+            self.memo[account] = matched
+        return matched
 
     def execute(self, trans: Transaction) -> Set[Posting]:
         "Runs the query on `data`"
         return {i for i, posting in enumerate(trans.postings)
-                if self.regex.search(posting.account_name) is not None}
+                if self.matches_account(posting.account)}
+
+    def execute_mask(self, trans: Transaction) -> int:
+        mask = 0
+        for i, posting in enumerate(trans.postings):
+            if self.matches_account(posting.account):
+                mask |= 1 << i
+        return mask
+
+    def matcher(self) -> Matcher:
+        memo, search = self.memo, self.regex.search
+
+        def match(trans, posting):
+            account = posting.account
+            matched = memo.get(account)
+            if matched is None:
+                matched = search(':'.join(account)) is not None
+                memo[account] = matched
+            return matched
+        return match
+
+    def candidates(self, journal: Journal) -> Optional[List[int]]:
+        return journal.transactions_with_accounts(
+            a for a in journal.accounts if self.matches_account(a))
 
     @classmethod
     def from_string(cls, s):
@@ -42,6 +124,48 @@ class Or(Query):
         "Runs the query on data"
         return set.union(*(q.execute(trans) for q in self.queries))
 
+    def execute_mask(self, trans: Transaction) -> int:
+        everything = all_postings_mask(trans)
+        mask = 0
+        for query in self.queries:
+            mask |= query.execute_mask(trans)
+            if mask == everything:
+                break
+        return mask
+
+    def candidates(self, journal: Journal) -> Optional[List[int]]:
+        positions = set()
+        for query in self.queries:
+            found = query.candidates(journal)
+            if found is None:
+                return None
+            positions.update(found)
+        return sorted(positions)
+
+    def matcher(self) -> Matcher:
+        # Nested ORs are flattened and their regex leaves merged into as
+        # few alternations as possible
+        leaves = list(flatten(self, Or))
+        matchers = [RegexQuery(regex).matcher()
+                    for regex in merge_regexes(
+                        q.regex for q in leaves if is_mergeable(q))]
+        matchers += [q.matcher() for q in leaves if not is_mergeable(q)]
+        if len(matchers) == 1:
+            return matchers[0]
+        if len(matchers) == 2:
+            first, second = matchers
+
+            def match(trans, posting):
+                return first(trans, posting) or second(trans, posting)
+            return match
+
+        def match(trans, posting):
+            for matcher in matchers:
+                if matcher(trans, posting):
+                    return True
+            return False
+        return match
+
 
 @dataclass(frozen=True)
 class And(Query):
@@ -52,6 +176,39 @@ class And(Query):
         "Runs the query on data"
         return set.intersection(*(q.execute(trans) for q in self.queries))
 
+    def execute_mask(self, trans: Transaction) -> int:
+        mask = all_postings_mask(trans)
+        for query in self.queries:
+            mask &= query.execute_mask(trans)
+            if not mask:
+                break
+        return mask
+
+    def candidates(self, journal: Journal) -> Optional[List[int]]:
+        found = [query.candidates(journal) for query in self.queries]
+        found = sorted((f for f in found if f is not None), key=len)
+        if not found:
+            return None
+        if len(found) == 1:
+            return found[0]
+        return sorted(set(found[0]).intersection(*found[1:]))
+
+    def matcher(self) -> Matcher:
+        matchers = [q.matcher() for q in flatten(self, And)]
+        if len(matchers) == 2:
+            first, second = matchers
+
+            def match(trans, posting):
+                return first(trans, posting) and second(trans, posting)
+            return match
+
+        def match(trans, posting):
+            for matcher in matchers:
+                if not matcher(trans, posting):
+                    return False
+            return True
+        return match
+
 
 @dataclass(frozen=True)
 class Not(Query):
@@ -62,6 +219,16 @@ class Not(Query):
         "Runs the query on data"
         return set(range(len(trans.postings))) - self.query.execute(trans)
 
+    def execute_mask(self, trans: Transaction) -> int:
+        return all_postings_mask(trans) ^ self.query.execute_mask(trans)
+
+    def matcher(self) -> Matcher:
+        inner = self.query.matcher()
+
+        def match(trans, posting):
+            return not inner(trans, posting)
+        return match
+
 
 @dataclass(frozen=True)
 class PayeeQuery(Query):
@@ -77,6 +244,55 @@ class PayeeQuery(Query):
             return set([])
         return set(range(len(trans.postings)))
 
+    def execute_mask(self, trans: Transaction) -> int:
+        if self.query.regex.search(trans.description) is None:
+            return 0
+        return all_postings_mask(trans)
+
+    def candidates(self, journal: Journal) -> Optional[List[int]]:
+        return journal.transactions_with_payee(self.query.regex)
+
+    def matcher(self) -> Matcher:
+        search = self.query.regex.search
+
+        def match(trans, posting):
+            return search(trans.description) is not None
+        return match
+
+
+@dataclass(frozen=True)
+class DateQuery(Query):
+    """
+    A query that matches every posting of the transactions dated from
+    `begin` up to, but not including, `end`. Either bound may be left open.
+    """
+    begin: Optional[date] = None
+    end: Optional[date] = None
+
+    def contains(self, trans: Transaction) -> bool:
+        "Whether `trans` is dated within the range"
+        day = trans.date.date()
+        return ((self.begin is None or self.begin <= day)
+                and (self.end is None or day < self.end))
+
+    def execute(self, trans: Transaction) -> Set[Posting]:
+        "Runs the query on data"
+        if not self.contains(trans):
+            return set()
+        return set(range(len(trans.postings)))
+
+    def execute_mask(self, trans: Transaction) -> int:
+        if not self.contains(trans):
+            return 0
+        return all_postings_mask(trans)
+
+    def matcher(self) -> Matcher:
+        contains = self.contains
+        return lambda trans, posting: contains(trans)
+
+    def candidates(self, journal: Journal) -> Optional[List[int]]:
+        return journal.transactions_between(self.begin, self.end)
+
 
 @dataclass(frozen=True)
 class AlwaysTrueQuery(Query):
@@ -84,10 +300,120 @@ class AlwaysTrueQuery(Query):
     def execute(self, trans: Transaction):
         return set(range(len(trans.postings)))
 
+    def execute_mask(self, trans: Transaction) -> int:
+        return all_postings_mask(trans)
+
+    def postings_matching(self, trans: Transaction) -> Iterator[Posting]:
+        return iter(trans.postings)
+
+    def matches(self, trans: Transaction) -> bool:
+        return bool(trans.postings)
+
+    def matcher(self) -> Matcher:
+        return lambda trans, posting: True
+
+    def compile(self) -> Query:
+        # Callers look for MATCH_ALL to skip querying altogether
+        return self
+
 
 MATCH_ALL = AlwaysTrueQuery()
 
 
+@dataclass(frozen=True)
+class CompiledQuery(Query):
+    "A query lowered to a single function that is run on every posting"
+    query: Query
+    match: Matcher = field(compare=False, repr=False)
+
+    def execute(self, trans: Transaction) -> Set[Posting]:
+        "Runs the query on data"
+        match = self.match
+        return {i for i, posting in enumerate(trans.postings)
+                if match(trans, posting)}
+
+    def execute_mask(self, trans: Transaction) -> int:
+        match = self.match
+        mask = 0
+        for i, posting in enumerate(trans.postings):
+            if match(trans, posting):
+                mask |= 1 << i
+        return mask
+
+    def postings_matching(self, trans: Transaction) -> Iterator[Posting]:
+        match = self.match
+        return (posting for posting in trans.postings
+                if match(trans, posting))
+
+    def matches(self, trans: Transaction) -> bool:
+        "Whether the query matches any posting of `trans`"
+        match = self.match
+        for posting in trans.postings:
+            if match(trans, posting):
+                return True
+        return False
+
+    def matcher(self) -> Matcher:
+        return self.match
+
+    def candidates(self, journal: Journal) -> Optional[List[int]]:
+        return self.query.candidates(journal)
+
+    def compile(self) -> Query:
+        return self
+
+
+def parse_day(datestr: str) -> date:
+    "Parses the day of a journal date, raising ValueError if it is invalid"
+    return parser.parse_date(datestr).date()
+
+
+def all_postings_mask(trans: Transaction) -> int:
+    "The bitmask that selects every posting of `trans`"
+    return (1 << len(trans.postings)) - 1
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    "Yields the positions of the bits set in `mask`, lowest first"
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def flatten(query: Query, kind: type) -> Iterator[Query]:
+    "Yields the operands of nested `kind` queries, like `Or`s inside `Or`s"
+    if isinstance(query, kind):
+        for subquery in query.queries:
+            yield from flatten(subquery, kind)
+    else:
+        yield query
+
+
+# Inline flags, which are only allowed at the start of a pattern
+GLOBAL_FLAGS_RE = re.compile(r'\(\?[aiLmsux]+\)')
+
+
+def is_mergeable(query: Query) -> bool:
+    """
+    Whether a query is a regex that can be merged into an alternation with
+    others, which rules out patterns that number groups or set flags inline
+    """
+    return (isinstance(query, RegexQuery) and query.regex.groups == 0
+            and isinstance(query.regex.pattern, str)
+            and not GLOBAL_FLAGS_RE.search(query.regex.pattern))
+
+
+def merge_regexes(regexes: Iterable[re.Pattern]) -> List[re.Pattern]:
+    "Merges regexes that share flags into a single alternation each"
+    by_flags = {}
+    for regex in regexes:
+        by_flags.setdefault(regex.flags, []).append(regex)
+    return [group[0] if len(group) == 1 else re.compile(
+        '|'.join('(?:{})'.format(r.pattern) for r in group), flags)
+            for flags, group in by_flags.items()]
+
+
 def build_simple_or_query(strs: Iterable[str]) -> Query:
     "Builds an or query from an iterator of regular expressions"
     queries = tuple([RegexQuery(re.compile(s)) for s in strs])
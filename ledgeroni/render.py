@@ -0,0 +1,106 @@
+"""
+render.py: buffered output of reports, shared by the subcommands
+
+Reports print up to millions of lines. A `Renderer` decides once whether to
+color them, so uncolored output never carries escape codes that have to be
+stripped again, keeps a formatter for each commodity, and writes lines to the
+output in large chunks instead of one at a time.
+"""
+import sys
+from typing import Callable, Dict, List, TextIO
+
+from colorama import Fore, Style
+
+from ledgeroni.amount import Amount
+from ledgeroni.types import Commodity
+
+# Characters collected before they are written out
+BUFFER_SIZE = 1 << 16
+AMOUNT_WIDTH = 20
+
+Formatter = Callable[[Amount], str]
+
+
+class Renderer:
+    """
+    Writes the lines of a report to `stream`, standard output by default.
+    Lines are colored if `color` is true, and written out at the end of every
+    entry if `line_buffered` is true. If either is None, it is true when the
+    stream is a terminal.
+    """
+
+    def __init__(self, stream: TextIO = None, color: bool = None,
+                 line_buffered: bool = None):
+        self.stream = sys.stdout if stream is None else stream
+        isatty = getattr(self.stream, 'isatty', None)
+        tty = bool(isatty and isatty())
+        color = tty if color is None else color
+        self.color = color
+        self.line_buffered = tty if line_buffered is None else line_buffered
+        self.bright = Style.BRIGHT if color else ''
+        self.blue = Fore.BLUE if color else ''
+        self.red = Fore.RED if color else ''
+        self.reset = Style.RESET_ALL if color else ''
+        self.formatters: Dict[Commodity, Formatter] = {}
+        self.lines: List[str] = []
+        self.size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def style(self, style: str, text: str) -> str:
+        "Wraps `text` in one of the renderer's styles, like `self.blue`"
+        if not style:
+            return text
+        return style + text + self.reset
+
+    def pad(self, style: str, text: str, width: int) -> str:
+        "Styles `text` and pads it with spaces to `width` visible characters"
+        return self.style(style, text) + ' ' * (width - len(text))
+
+    def formatter(self, commodity: Commodity) -> Formatter:
+        """
+        Returns the function that formats amounts of `commodity` into right
+        aligned cells, with negative amounts in red
+        """
+        formatter = self.formatters.get(commodity)
+        if formatter is not None:
+            return formatter
+        text = str if commodity is None else commodity.format_amount
+        red, reset = self.red, self.reset
+
+        def formatter(amount):
+            cell = text(amount).rjust(AMOUNT_WIDTH)
+            if red and amount < 0:
+                return red + cell + reset
+            return cell
+        self.formatters[commodity] = formatter
+        return formatter
+
+    def amount(self, commodity: Commodity, amount: Amount) -> str:
+        "Formats an amount for display in a right aligned cell"
+        return self.formatter(commodity)(amount)
+
+    def write(self, line: str):
+        "Writes a line, buffering it until enough lines are collected"
+        self.lines.append(line)
+        self.size += len(line)
+        if self.size >= BUFFER_SIZE:
+            self.flush()
+
+    def end_entry(self):
+        "Marks the end of the lines of an entry, like a transaction"
+        if self.line_buffered:
+            self.flush()
+
+    def flush(self):
+        "Writes out every buffered line"
+        if self.lines:
+            self.lines.append('')
+            self.stream.write('\n'.join(self.lines))
+            self.lines = []
+            self.size = 0
+        self.stream.flush()
@@ -0,0 +1,161 @@
+"""
+running.py: running total reports over journal frames
+
+The running total after every posting is a cumulative sum per commodity over
+the rows of a `JournalFrame`. With NumPy the sums are computed for blocks of
+rows at once, with one column per commodity. The report then hands out
+`RegisterRow`s that only hold the pairs to be printed, instead of copying a
+dict of totals for every posting.
+"""
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from ledgeroni.amount import Amount
+from ledgeroni.frame import JournalFrame, NO_COMMODITY
+from ledgeroni.query import Query, MATCH_ALL
+from ledgeroni.types import Commodity, Transaction
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# Rows whose cumulative sums are computed at once with NumPy
+BLOCK_SIZE = 1 << 14
+INT64_MAX = 2 ** 63 - 1
+
+Pairs = List[Tuple[Commodity, Amount]]
+
+
+class RegisterRow:
+    """
+    A line of the register: a posting's account, the amounts it changes and
+    the non zero running totals after it
+    """
+    __slots__ = ('account_name', 'changes', 'totals')
+
+    def __init__(self, account_name: str, changes: Pairs, totals: Pairs):
+        self.account_name = account_name
+        self.changes = changes
+        self.totals = totals
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not RegisterRow:
+            return NotImplemented
+        return (self.account_name == other.account_name
+                and self.changes == other.changes
+                and self.totals == other.totals)
+
+    def __repr__(self) -> str:
+        return 'RegisterRow({!r}, {!r}, {!r})'.format(
+            self.account_name, self.changes, self.totals)
+
+
+def matching_transactions(
+        frame: JournalFrame, query: Query, transactions: Sequence[Transaction],
+        candidates: Optional[Sequence[int]] = None) -> List[int]:
+    """
+    Indexes of the transactions with any posting that `query` matches,
+    looking only at `candidates` if given
+    """
+    if candidates is None:
+        candidates = range(len(transactions))
+    if query is MATCH_ALL:
+        return [i for i in candidates
+                if frame.offsets[i] != frame.offsets[i + 1]]
+    return [i for i in candidates if query.matches(transactions[i])]
+
+
+def running_totals(frame: JournalFrame,
+                   rows: Sequence[int]) -> Tuple[List[int], Iterator[List]]:
+    """
+    Returns the commodity ids in the order they first appear in `rows`,
+    along with the running totals, in that order, after each row
+    """
+    commodities = [frame.commodity[row] for row in rows]
+    order = list(dict.fromkeys(c for c in commodities if c != NO_COMMODITY))
+    if numpy is None or not isinstance(frame.amount, numpy.ndarray):
+        return order, _running_totals_python(frame, rows, order)
+    return order, _running_totals_numpy(frame, rows, order)
+
+
+def _running_totals_python(frame: JournalFrame, rows: Sequence[int],
+                           order: List[int]) -> Iterator[List[int]]:
+    "`running_totals` without NumPy"
+    columns = {commodity: i for i, commodity in enumerate(order)}
+    totals = [0] * len(order)
+    for row in rows:
+        commodity = frame.commodity[row]
+        if commodity != NO_COMMODITY:
+            totals[columns[commodity]] += int(frame.amount[row])
+        yield totals
+
+
+def _running_totals_numpy(frame: JournalFrame, rows: Sequence[int],
+                          order: List[int]) -> Iterator[List]:
+    "`running_totals` with one cumulative sum per commodity column"
+    rows = numpy.asarray(rows, dtype=numpy.int64)
+    lookup = numpy.zeros(len(frame.names.commodities) + 1, dtype=numpy.int64)
+    lookup[order] = numpy.arange(len(order))
+    amounts = frame.amount[rows]
+    valued = frame.commodity[rows] != NO_COMMODITY
+    columns = lookup[frame.commodity[rows]]
+    dtype = amounts.dtype
+    if dtype != object and len(amounts) and (
+            int(numpy.abs(amounts).max()) > INT64_MAX // len(amounts)):
+        # The sums could overflow
+        dtype = object
+    carry = numpy.zeros(len(order), dtype=dtype)
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        changes = numpy.zeros((len(rows[block]), len(order)), dtype=dtype)
+        selected = numpy.flatnonzero(valued[block])
+        changes[selected, columns[block][selected]] = (
+            amounts[block][selected])
+        sums = numpy.cumsum(changes, axis=0) + carry
+        carry = sums[-1]
+        yield from sums.tolist()
+
+
+def generate_running_totals(
+        frame: JournalFrame, transactions: Sequence[Transaction],
+        query: Query, candidates: Optional[Sequence[int]] = None
+) -> Iterator[Tuple[Transaction, List[RegisterRow]]]:
+    """
+    Generates the register rows of the transactions that `query` matches,
+    like `Journal.generate_running_total_report`. `transactions` are the ones
+    the frame was built from, and `candidates` the positions of the only ones
+    `query` could match, see `Query.candidates`.
+    """
+    matched = matching_transactions(frame, query, transactions, candidates)
+    offsets = frame.offsets.tolist()
+    rows = [row for index in matched
+            for row in range(offsets[index], offsets[index + 1])]
+    order, totals = running_totals(frame, rows)
+    commodities = [frame.names.commodities[c] for c in order]
+    scales = [frame.scales[c] for c in order]
+    accounts = frame.names.accounts
+    posting = frame.posting.tolist()
+    account = frame.account.tolist()
+    commodity = frame.commodity.tolist()
+
+    for index in matched:
+        end = offsets[index + 1]
+        register_rows = {}
+        row = offsets[index]
+        while row < end:
+            changes = []
+            number = posting[row]
+            while row < end and posting[row] == number:
+                running = next(totals)
+                if commodity[row] != NO_COMMODITY:
+                    changes.append((frame.names.commodities[commodity[row]],
+                                    frame.amount_at(row)))
+                row += 1
+            name = ':'.join(accounts[account[row - 1]])
+            # Rows are keyed by account name, so a later posting to the same
+            # account replaces an earlier one, in the earlier one's place
+            register_rows[name] = RegisterRow(
+                name, changes,
+                [(c, Amount(total, scale)) for c, scale, total
+                 in zip(commodities, scales, running) if total])
+        yield transactions[index], list(register_rows.values())
@@ -48,6 +48,7 @@ class JournalSorter:
     def sort_journal(self, journal: Journal):
         "Sorts a journal's transactions"
         self.sort_transactions(journal.transactions)
+        journal.rebuild_index()
 
     @classmethod
     def from_term_list(cls, terms: Iterable[str]) -> JournalSorter:
@@ -0,0 +1,30 @@
+"""
+stream.py: reads the transactions of journals one at a time, for reports that
+look at each transaction once and don't need a `Journal`
+"""
+from typing import Iterable, Iterator, List
+
+from ledgeroni import parser
+from ledgeroni.interning import InternTable
+from ledgeroni.types import Transaction
+
+
+def read_transactions(filenames: Iterable[str], errors: List[Transaction],
+                      names: InternTable = None) -> Iterator[Transaction]:
+    """
+    Generates the transactions of the given journal files in order, with
+    their implicit amounts filled in. Unbalanced transactions are appended to
+    `errors` instead. Commodities and accounts are interned in `names`, or
+    in a table of their own if not given.
+    """
+    if names is None:
+        names = InternTable()
+    for filename in filenames:
+        for result in parser.read_file(filename, names=names):
+            if not isinstance(result, Transaction):
+                continue
+            result.settle()
+            if result.verify_balance():
+                yield result
+            else:
+                errors.append(result)
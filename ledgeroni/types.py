@@ -2,11 +2,10 @@
 types.py: defines data types that are parsed from a ledger journal file
 """
 from __future__ import annotations
-from dataclasses import dataclass, field
+from dataclasses import dataclass, FrozenInstanceError
 from collections import defaultdict
-from typing import List, Tuple, Dict, Iterator
-import copy
-from fractions import Fraction
+from typing import List, Tuple, Dict, Iterable, Iterator, Optional
+from ledgeroni.amount import Amount
 from arrow.arrow import Arrow
 
 
@@ -16,12 +15,23 @@ class Commodity:
     name: str
     is_prefix: bool = False
 
+    def __post_init__(self):
+        # Commodities key every amount dict, so the hash is only computed once
+        object.__setattr__(self, '_hash', hash((self.name, self.is_prefix)))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self):
+        # String hashes differ between processes, so the hash isn't pickled
+        return (Commodity, (self.name, self.is_prefix))
+
     @property
     def symbol(self) -> str:
         "The commodity symbol without surrounding whitespace"
         return self.name.strip()
 
-    def format_amount(self, amt: Fraction) -> str:
+    def format_amount(self, amt: Amount) -> str:
         "Formats the amount passed in with the commodity symbol"
         amt = '{:.2f}'.format(float(amt))
         if self.is_prefix:
@@ -33,11 +43,15 @@ class IntegerCommodity():
     name: str = ''
     is_prefix: bool = False
 
+    def __reduce__(self):
+        # Unpickle as the module level singleton so it keeps hashing the same
+        return 'INTEGER_COMMODITY'
+
     @property
     def symbol(self) -> str:
         return ''
 
-    def format_amount(self, amt: Fraction) -> str:
+    def format_amount(self, amt: Amount) -> str:
         "Formats the amount passed in with the commodity symbol"
         return '{:.2f}'.format(float(amt))
 
@@ -45,11 +59,61 @@ class IntegerCommodity():
 INTEGER_COMMODITY = IntegerCommodity()
 
 
-@dataclass(frozen=True)
+# Marks a posting whose amounts are not a single commodity, in which case its
+# `_amount` slot holds the amounts dict, or None for an auto balanced posting
+_NOT_SINGLE = object()
+# Marks a transaction whose balance hasn't been worked out yet
+_UNSETTLED = object()
+
+
 class Posting:
-    "Represents a movement in a specific account"
-    account: Tuple[str]
-    amounts: Dict = field(default_factory=dict)
+    """
+    Represents a movement in a specific account. A posting with a single
+    commodity, which is almost every posting, keeps its commodity and amount
+    in slots instead of a dict, which is only built when `amounts` is read.
+    """
+    __slots__ = ('account', '_commodity', '_amount')
+
+    def __init__(self, account: Tuple[str], amounts: Dict = _NOT_SINGLE):
+        if amounts is _NOT_SINGLE:
+            amounts = {}
+        setattr_ = object.__setattr__
+        setattr_(self, 'account', account)
+        if amounts is not None and len(amounts) == 1:
+            (commodity, amount), = amounts.items()
+            setattr_(self, '_commodity', commodity)
+            setattr_(self, '_amount', amount)
+        else:
+            setattr_(self, '_commodity', _NOT_SINGLE)
+            setattr_(self, '_amount', amounts)
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError('cannot assign to field {!r}'.format(name))
+
+    __delattr__ = __setattr__
+
+    @property
+    def is_auto(self) -> bool:
+        "Whether the posting has no amount and balances its transaction"
+        return self._commodity is _NOT_SINGLE and self._amount is None
+
+    @property
+    def amounts(self) -> Optional[Dict]:
+        "Amounts by commodity, or None if the posting is auto balanced"
+        if self._commodity is _NOT_SINGLE:
+            return self._amount
+        return {self._commodity: self._amount}
+
+    def amount_items(self) -> Iterable[Tuple[Commodity, Amount]]:
+        """
+        The `(commodity, amount)` pairs of the posting, without building a
+        dict. Empty if the posting is auto balanced.
+        """
+        if self._commodity is not _NOT_SINGLE:
+            return ((self._commodity, self._amount),)
+        if self._amount is None:
+            return ()
+        return self._amount.items()
 
     @property
     def account_name(self) -> str:
@@ -58,23 +122,80 @@ class Posting:
 
     def as_journal_format(self) -> str:
         "Returns the posting formatted in a ledger journal format"
-        amount_str = ''
-        if self.amounts:
-            amount_str = ' '.join(c.format_amount(a)
-                                  for c, a in self.amounts.items())
+        amount_str = ' '.join(c.format_amount(a)
+                              for c, a in self.amount_items())
         return '\t{:<25}\t{:>20}'.format(self.account_name, amount_str)
 
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not Posting:
+            return NotImplemented
+        return (self.account == other.account
+                and self._commodity == other._commodity
+                and self._amount == other._amount)
+
+    def __hash__(self) -> int:
+        return hash((self.account, self._commodity, self._amount))
+
+    def __repr__(self) -> str:
+        return 'Posting(account={!r}, amounts={!r})'.format(self.account,
+                                                            self.amounts)
+
+    def __reduce__(self):
+        if self._commodity is _NOT_SINGLE:
+            return (Posting, (self.account, self._amount))
+        return (_restore_posting, (self.account, self._commodity,
+                                   self._amount))
+
+
+def _restore_posting(account, commodity, amount) -> Posting:
+    "Rebuilds a pickled single commodity posting without building a dict"
+    posting = Posting.__new__(Posting)
+    object.__setattr__(posting, 'account', account)
+    object.__setattr__(posting, '_commodity', commodity)
+    object.__setattr__(posting, '_amount', amount)
+    return posting
+
 
-@dataclass
 class Transaction:
-    "Represents a transaction of commodities"
-    date: Arrow
-    description: str
-    postings: List[Posting] = field(default_factory=list)
+    """
+    Represents a transaction of commodities. The transaction with its
+    implicit amounts filled in and whether it balances are worked out
+    together the first time either is needed, and kept until a posting is
+    added through `add_posting`.
+    """
+    __slots__ = ('date', 'description', 'postings', '_balanced',
+                 '_is_balanced')
+
+    def __init__(self, date: Arrow, description: str,
+                 postings: List[Posting] = None):
+        self.date = date
+        self.description = description
+        self.postings = [] if postings is None else postings
+        self._balanced = _UNSETTLED
+        self._is_balanced = False
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not Transaction:
+            return NotImplemented
+        return (self.date == other.date
+                and self.description == other.description
+                and self.postings == other.postings)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return ('Transaction(date={!r}, description={!r}, '
+                'postings={!r})').format(self.date, self.description,
+                                         self.postings)
+
+    def __reduce__(self):
+        # The settled state is derived, so it's neither copied nor pickled
+        return (Transaction, (self.date, self.description, self.postings))
 
     def add_posting(self, posting: Posting):
         "Adds a posting to this transaction"
         self.postings.append(posting)
+        self._balanced = _UNSETTLED
 
     @property
     def date_str(self):
@@ -91,45 +212,57 @@ class Transaction:
         return '\n'.join([self.header] + [p.as_journal_format()
                                           for p in self.postings])
 
-    def verify_balance(self) -> bool:
-        totals = defaultdict(Fraction)
-        for posting in self.postings:
-            # If a null amount posting exists, we're done
-            if posting.amounts is None:
-                return True
-            for commodity, amount in posting.amounts.items():
-                totals[commodity] += amount
-
-        if len(totals) == 2:
-            # Can auto balance if we have exactly two commodities
-            return True
-
-        return all(a == 0 for a in totals.values())
-
-    def calc_totals(self) -> Transaction:
+    def settle(self):
         """
-        Returns a new transaction where postings with implicit amounts are
-        made explicit
+        Sums the postings once to both fill in the implicit amount and check
+        the balance, see `calc_totals` and `verify_balance`
         """
         auto_posting = None
-        totals = defaultdict(Fraction)
+        autos = 0
+        totals = defaultdict(Amount)
         for i, posting in enumerate(self.postings):
-            if posting.amounts is None:
-                if auto_posting is not None:
-                    raise ValueError
+            if posting.is_auto:
                 auto_posting = i
+                autos += 1
             else:
-                for commodity, amount in posting.amounts.items():
+                for commodity, amount in posting.amount_items():
                     totals[commodity] -= amount
 
-        new_trans = self
-        if auto_posting is not None:
-            new_trans = copy.copy(self)
-            new_trans.postings = new_trans.postings[:]
-            new_trans.postings[auto_posting] = Posting(
+        # A null amount posting balances anything, and so can having exactly
+        # two commodities
+        self._is_balanced = bool(autos) or len(totals) == 2 or all(
+            a == 0 for a in totals.values())
+
+        if autos > 1:
+            # Can't tell how to split the amount, calc_totals will raise
+            self._balanced = None
+        elif autos:
+            balanced = Transaction(self.date, self.description,
+                                   self.postings[:])
+            balanced.postings[auto_posting] = Posting(
                 account=self.postings[auto_posting].account,
                 amounts=totals)
-        return new_trans
+            balanced._balanced = balanced
+            balanced._is_balanced = True
+            self._balanced = balanced
+        else:
+            self._balanced = self
+
+    def verify_balance(self) -> bool:
+        if self._balanced is _UNSETTLED:
+            self.settle()
+        return self._is_balanced
+
+    def calc_totals(self) -> Transaction:
+        """
+        Returns a transaction where postings with implicit amounts are made
+        explicit. This is a new transaction unless there are none.
+        """
+        if self._balanced is _UNSETTLED:
+            self.settle()
+        if self._balanced is None:
+            raise ValueError
+        return self._balanced
 
 
 @dataclass(frozen=True)
@@ -153,3 +286,7 @@ class DefaultCommodity:
     commodity: Commodity
 
 
+@dataclass(frozen=True)
+class Include:
+    "Marks where another journal file is included"
+    filename: str
@@ -1,22 +1,20 @@
 """
 Utilities for working with ledger types
 """
-from colorama import Fore, Style
+import itertools
+from collections import deque
+from typing import Iterable, Optional
 
 
-def safe_format_amount(commodity, amount):
+def head_and_tail(items: Iterable, head: Optional[int] = None,
+                  tail: Optional[int] = None) -> Iterable:
     """
-    Formats an amount with a commodity, or without it if the commodity is None
+    Keeps the first `head` items, and of those the last `tail`, like piping
+    through `head` and `tail`. Items after the first `head` are never asked
+    for, and only the last `tail` are held at once.
     """
-    if commodity is None:
-        return str(amount)
-    return commodity.format_amount(amount)
-
-
-def format_amount(commodity, amount):
-    "Formats the given amount for final display"
-    fmted = safe_format_amount(commodity, amount)
-    fmted = '{:>20}'.format(fmted)
-    if amount < 0:
-        fmted = Fore.RED + fmted + Style.RESET_ALL
-    return fmted
+    if head is not None:
+        items = itertools.islice(items, head)
+    if tail is not None:
+        items = deque(items, maxlen=tail)
+    return items
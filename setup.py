@@ -11,6 +11,9 @@ setup(
         'six',
         'colorama'
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     entry_points='''
         [console_scripts]
         ledgeroni=ledgeroni.cli:cli
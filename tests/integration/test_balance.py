@@ -38,3 +38,60 @@ def test_filtering():
     assert result.exit_code == 0
     assert 'Bank:Paypal' in result.output
     assert 'income' not in result.output
+
+
+def test_invalid_date_in_filter():
+    "A bad date in a filter is reported like a bad option"
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', 'bal', 'date>=garbage'])
+    assert result.exit_code == 2
+    assert 'invalid date: garbage' in result.output
+
+
+def test_cache_dir(tmp_path):
+    "Cached and uncached runs produce the same output"
+    runner = CliRunner()
+    args = ['-f', 'tests/sample_data/index.ledger', '--price-db',
+            'tests/sample_data/prices_db', 'bal']
+    expected = runner.invoke(cli, args).output
+    for _ in range(2):
+        result = runner.invoke(cli, ['--cache-dir', str(tmp_path)] + args)
+        assert result.exit_code == 0
+        assert result.output == expected
+
+
+def test_engines():
+    "Both balance engines print the same report"
+    runner = CliRunner()
+    outputs = [runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', '--price-db',
+        'tests/sample_data/prices_db', 'bal', '--engine', engine,
+        'not', 'Reddit']).output for engine in ('tree', 'grouped')]
+    assert outputs[0] == outputs[1]
+    assert 'Bank:Paypal' in outputs[0]
+
+
+def test_stream():
+    "Streaming prints the same balance as loading the journal"
+    runner = CliRunner()
+    args = ['-f', 'tests/sample_data/index.ledger', '--price-db',
+            'tests/sample_data/prices_db', 'bal']
+    for filters in ([], ['not', 'Reddit'], ['@Client']):
+        expected = runner.invoke(cli, args + filters)
+        result = runner.invoke(cli, args + ['--stream'] + filters)
+        assert result.exit_code == 0
+        assert result.output == expected.output
+
+
+def test_stream_unbalanced(tmp_path):
+    "Streaming reports unbalanced transactions after reading everything"
+    journal = tmp_path / 'unbalanced.ledger'
+    journal.write_text('2013/02/20 Unbalanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash      -$5\n')
+    runner = CliRunner()
+    result = runner.invoke(cli, ['-f', str(journal), 'bal', '--stream'])
+    assert result.exit_code == 1
+    assert result.output == (
+        'ERROR! Transaction unbalanced: 2013/02/20 Unbalanced\n')
@@ -0,0 +1,16 @@
+from click.testing import CliRunner
+from ledgeroni.cli import cli
+
+
+def test_explain():
+    "Shows the plan of a filter"
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', '-e', '2013', 'explain',
+        'Expense', 'and', 'Reddit'])
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[0] == 'visits 0 of 7 transactions'
+    assert lines[1].startswith('and ')
+    assert 'account /Reddit/' in result.output
+    assert 'date [, 2013-01-01)' in result.output
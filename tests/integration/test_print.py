@@ -31,3 +31,102 @@ def test_without_ledger():
     result = runner.invoke(cli, [
         '--price-db', 'tests/sample_data/prices_db', 'balance'])
     assert result.exit_code == 2
+
+
+def test_date_range():
+    "Only prints the transactions within the --begin and --end dates"
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', '-b', '2012/07/01',
+        '-e', '2012/11/29', 'print'])
+    assert result.exit_code == 0
+    assert 'Partial payment from Client X' in result.output
+    assert 'Sold some bitcoins' in result.output
+    assert 'Purchased bitcoins' not in result.output
+    assert 'I owe Joe for a favor' not in result.output
+
+    result = runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', 'print', 'Bitcoin', 'and',
+        'date>=2012/11/29'])
+    assert result.exit_code == 0
+    assert 'Purchased bitcoins' in result.output
+    assert 'Sold some bitcoins' not in result.output
+
+
+def test_invalid_date():
+    "Rejects dates that don't exist"
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', '-b', '2012/02/30', 'print'])
+    assert result.exit_code == 2
+
+
+def test_stream():
+    "Streaming prints the same transactions as loading the journal"
+    runner = CliRunner()
+    args = ['-f', 'tests/sample_data/index.ledger', 'print']
+    for filters in ([], ['Expense'], ['Nothing']):
+        expected = runner.invoke(cli, args + filters)
+        result = runner.invoke(cli, args + ['--stream'] + filters)
+        assert result.exit_code == 0
+        assert result.output == expected.output
+
+
+def test_stream_unbalanced(tmp_path):
+    "Streaming prints the balanced transactions, then reports the rest"
+    journal = tmp_path / 'unbalanced.ledger'
+    journal.write_text('2013/02/20 Balanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash\n'
+                       '\n'
+                       '2013/02/21 Unbalanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash      -$5\n')
+    runner = CliRunner()
+    result = runner.invoke(cli, ['-f', str(journal), 'print', '--stream'])
+    assert result.exit_code == 1
+    assert result.output.startswith('2013/02/20 Balanced\n')
+    assert result.output.endswith(
+        'ERROR! Transaction unbalanced: 2013/02/21 Unbalanced\n')
+
+
+def test_head_and_tail():
+    "Limits print to its first or last transactions"
+    runner = CliRunner()
+    args = ['-f', 'tests/sample_data/index.ledger', 'print']
+    full = runner.invoke(cli, args).output.split('\n\n')
+    for extra in ([], ['--stream']):
+        head = runner.invoke(cli, args + extra + ['--head', '2'])
+        assert head.exit_code == 0
+        assert head.output == '\n\n'.join(full[:2]) + '\n'
+
+        tail = runner.invoke(cli, args + extra + ['--tail', '2'])
+        assert tail.exit_code == 0
+        assert tail.output == '\n\n'.join(full[-2:])
+
+        none = runner.invoke(cli, args + extra + ['--head', '0'])
+        assert none.output == '\n'
+
+
+def test_head_stops_reading(tmp_path):
+    "Transactions after the head are not read, so they go unchecked"
+    journal = tmp_path / 'unbalanced.ledger'
+    journal.write_text('2013/02/20 Balanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash\n'
+                       '\n'
+                       '2013/02/21 Unbalanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash      -$5\n')
+    runner = CliRunner()
+    for extra in ([], ['--stream']):
+        args = ['-f', str(journal), 'print'] + extra
+        first = runner.invoke(cli, args + ['--head', '1'])
+        assert first.exit_code == 0
+        assert first.output.startswith('2013/02/20 Balanced')
+        assert 'Unbalanced' not in first.output
+
+        both = runner.invoke(cli, args + ['--head', '2'])
+        assert both.exit_code == 1
+        assert both.output.endswith(
+            'ERROR! Transaction unbalanced: 2013/02/21 Unbalanced\n')
@@ -45,3 +45,142 @@ def test_filtering():
     assert 'Purchased reddit gold for the year' in result.output
     assert 'I owe Joe for a favor' in result.output
 
+
+def test_jobs():
+    "Loading with several processes gives the same report"
+    runner = CliRunner()
+    args = ['-f', 'tests/sample_data/index.ledger', '--price-db',
+            'tests/sample_data/prices_db', 'reg']
+    expected = runner.invoke(cli, args).output
+    result = runner.invoke(cli, ['--jobs', '2'] + args)
+    assert result.exit_code == 0
+    assert result.output == expected
+
+
+def test_engines():
+    "Both register engines print the same report"
+    runner = CliRunner()
+    outputs = [runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', '-f',
+        'tests/sample_data/Triple.ledger', 'reg', '--engine', engine,
+        'not', 'Reddit']).output for engine in ('dict', 'cumulative')]
+    assert outputs[0] == outputs[1]
+    assert 'Bank:Paypal' in outputs[0]
+
+
+def test_stream():
+    "Streaming prints the same register as loading the journal"
+    runner = CliRunner()
+    args = ['-f', 'tests/sample_data/index.ledger', '--price-db',
+            'tests/sample_data/prices_db', 'reg']
+    for filters in ([], ['not', 'Reddit'], ['@Client']):
+        expected = runner.invoke(cli, args + filters)
+        result = runner.invoke(cli, args + ['--stream'] + filters)
+        assert result.exit_code == 0
+        assert result.output == expected.output
+
+
+def test_stream_unbalanced(tmp_path):
+    "Streaming prints the balanced transactions, then reports the rest"
+    journal = tmp_path / 'unbalanced.ledger'
+    journal.write_text('2013/02/20 Unbalanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash      -$5\n'
+                       '\n'
+                       '2013/02/21 Balanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash\n')
+    runner = CliRunner()
+    result = runner.invoke(cli, ['-f', str(journal), 'reg', '--stream'])
+    assert result.exit_code == 1
+    lines = result.output.splitlines()
+    assert '2013/02/21' in lines[0]
+    assert lines[-1] == 'ERROR! Transaction unbalanced: 2013/02/20 Unbalanced'
+
+
+def test_stream_with_sort():
+    "Streaming can't sort"
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', '-S', 'd', 'reg', '--stream'])
+    assert result.exit_code == 2
+
+
+def test_no_color():
+    "Output is never colored with --no-color"
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        '-f', 'tests/sample_data/index.ledger', '--no-color', 'reg'],
+        color=True)
+    assert result.exit_code == 0
+    assert '\x1b[' not in result.output
+    assert 'Bank:Paypal' in result.output
+
+
+def test_head_and_tail():
+    "Limits the register to its first or last rows"
+    runner = CliRunner()
+    args = ['-f', 'tests/sample_data/index.ledger', 'reg']
+    full = runner.invoke(cli, args).output.splitlines()
+    for extra in ([], ['--stream'], ['--engine', 'dict']):
+        head = runner.invoke(cli, args + extra + ['--head', '2'])
+        assert head.exit_code == 0
+        assert head.output.splitlines() == full[:2]
+
+        # The last three rows take six lines, and the first of them
+        # belongs to a transaction with another row before it
+        tail = runner.invoke(cli, args + extra + ['--tail', '3'])
+        assert tail.exit_code == 0
+        lines = tail.output.splitlines()
+        assert len(lines) == 6
+        assert lines[0].startswith('2012/07/01 Client X owes me')
+        assert lines[0][56:] == full[-6][56:]
+        assert lines[1:] == full[-5:]
+
+        both = runner.invoke(cli, args + extra + ['--head', '2',
+                                                  '--tail', '1'])
+        lines = both.output.splitlines()
+        assert len(lines) == 1
+        assert lines[0] == full[0][:56] + full[1][56:]
+
+
+def test_head_keeps_repeated_transactions_apart(tmp_path):
+    "Transactions included twice still get a header each"
+    (tmp_path / 'a.ledger').write_text('2013/01/01 A\n'
+                                       '    Expenses:Food    $10\n'
+                                       '    Assets:Cash\n')
+    journal = tmp_path / 'index.ledger'
+    journal.write_text('include a.ledger\ninclude a.ledger\n')
+    runner = CliRunner()
+    for jobs in ('1', '2'):
+        args = ['-f', str(journal), '-j', jobs, 'reg']
+        full = runner.invoke(cli, args)
+        head = runner.invoke(cli, args + ['--head', '10'])
+        assert head.exit_code == 0
+        assert head.output == full.output
+        assert head.output.count('2013/01/01 A') == 2
+
+
+def test_head_stops_reading(tmp_path):
+    "Transactions after the head are not read, so they go unchecked"
+    journal = tmp_path / 'unbalanced.ledger'
+    journal.write_text('2013/02/20 Balanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash\n'
+                       '\n'
+                       '2013/02/21 Unbalanced\n'
+                       '    Expenses:Food    $10\n'
+                       '    Assets:Cash      -$5\n')
+    runner = CliRunner()
+    for extra in ([], ['--stream']):
+        args = ['-f', str(journal), 'reg'] + extra
+        # The balanced transaction has two rows
+        first = runner.invoke(cli, args + ['--head', '2'])
+        assert first.exit_code == 0
+        assert first.output.startswith('2013/02/20 Balanced')
+        assert 'Unbalanced' not in first.output
+
+        both = runner.invoke(cli, args + ['--head', '3'])
+        assert both.exit_code == 1
+        assert both.output.endswith(
+            'ERROR! Transaction unbalanced: 2013/02/21 Unbalanced\n')
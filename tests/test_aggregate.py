@@ -1,12 +1,18 @@
 from datetime import datetime
+import os
 import re
 from fractions import Fraction
 import arrow
+import pytest
+from ledgeroni import aggregate
 from ledgeroni.aggregate import AccountAggregate
+from ledgeroni.frame import JournalFrame
 from ledgeroni.types import Commodity, Transaction, Posting
-from ledgeroni.query import RegexQuery, Not
+from ledgeroni.query import RegexQuery, Not, PayeeQuery, MATCH_ALL
 from ledgeroni.journal import Journal
 
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), 'sample_data')
+
 USD = Commodity(is_prefix=True, name='$')
 AU = Commodity(is_prefix=False, name='AU')
 BTC = Commodity(is_prefix=False, name=' BTC')
@@ -108,3 +114,50 @@ def test_add_from_journal():
     agg.add_from_journal(journal)
 
     assert agg.aggregates == {USD: 0, BTC: 0}
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+@pytest.mark.parametrize('query', [
+    MATCH_ALL, Not(RegexQuery(re.compile('Asset'))),
+    PayeeQuery(RegexQuery(re.compile('Client')))])
+def test_add_from_frame(use_numpy, query, monkeypatch):
+    if not use_numpy:
+        monkeypatch.setattr(aggregate, 'numpy', None)
+    elif aggregate.numpy is None:
+        pytest.skip('numpy is not installed')
+    journal = Journal()
+    journal.add_from_file(os.path.join(SAMPLE_DATA, 'index.ledger'))
+    journal.add_from_file(os.path.join(SAMPLE_DATA, 'Triple.ledger'))
+
+    expected = AccountAggregate(query=query)
+    expected.add_from_journal(journal)
+    agg = AccountAggregate(query=query)
+    agg.add_from_frame(JournalFrame.from_journal(journal),
+                       journal.transactions)
+
+    expected = list(expected.iter_aggregates())
+    result = list(agg.iter_aggregates())
+    assert result == expected
+    # Commodities keep the order they are first seen in
+    assert [list(totals) for _, _, totals in result] == [
+        list(totals) for _, _, totals in expected]
+
+
+@pytest.mark.parametrize('query', [
+    MATCH_ALL, Not(RegexQuery(re.compile('Asset'))),
+    PayeeQuery(RegexQuery(re.compile('Client')))])
+def test_add_from_transactions(query):
+    journal = Journal()
+    journal.add_from_file(os.path.join(SAMPLE_DATA, 'index.ledger'))
+    journal.add_from_file(os.path.join(SAMPLE_DATA, 'Triple.ledger'))
+
+    expected = AccountAggregate(query=query)
+    expected.add_from_journal(journal)
+    agg = AccountAggregate(query=query)
+    agg.add_from_transactions(iter(journal.transactions))
+
+    expected = list(expected.iter_aggregates())
+    result = list(agg.iter_aggregates())
+    assert result == expected
+    assert [list(totals) for _, _, totals in result] == [
+        list(totals) for _, _, totals in expected]
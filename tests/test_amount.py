@@ -0,0 +1,56 @@
+from fractions import Fraction
+import pickle
+import pytest
+from ledgeroni.amount import Amount
+
+
+def test_from_string():
+    assert Amount.from_string('1751.90') == Fraction('1751.90')
+    assert Amount.from_string('1751.90').scale == 2
+    assert Amount.from_string('-0.5') == Fraction(-1, 2)
+    assert Amount.from_string('.5') == Fraction(1, 2)
+    assert Amount.from_string('10') == 10
+    assert Amount.from_string('10.') == 10
+    with pytest.raises(ValueError):
+        Amount.from_string('1.2.3')
+    with pytest.raises(ValueError):
+        Amount.from_string('.')
+
+
+def test_arithmetic():
+    one_fifty = Amount.from_string('1.50')
+    assert one_fifty + Amount.from_string('0.255') == Fraction('1.755')
+    assert (one_fifty + Amount.from_string('0.255')).scale == 3
+    assert one_fifty - 2 == Fraction('-0.5')
+    assert 2 - one_fifty == Fraction('0.5')
+    assert -one_fifty == Fraction('-1.5')
+    assert one_fifty * 2 == 3
+    assert isinstance(one_fifty + 1, Amount)
+    assert sum([one_fifty, one_fifty], Amount()) == 3
+
+
+def test_fraction_fallback():
+    result = Amount.from_string('1.50') + Fraction(1, 3)
+    assert isinstance(result, Fraction)
+    assert result == Fraction(11, 6)
+    assert Amount(1) / 3 == Fraction(1, 3)
+
+
+def test_comparisons_and_hashing():
+    amount = Amount.from_string('-10.0')
+    assert amount == -10
+    assert amount == -10.0
+    assert amount < 0
+    assert amount > Fraction(-11)
+    assert not Amount(0, 2)
+    assert hash(amount) == hash(-10)
+    assert hash(Amount.from_string('1.5')) == hash(Fraction(3, 2))
+    assert {Amount(150, 2): 'x'}[Fraction(3, 2)] == 'x'
+
+
+def test_formatting_and_pickling():
+    assert str(Amount.from_string('-0.05')) == '-0.05'
+    assert str(Amount(1234, 0)) == '1234'
+    assert '{:.2f}'.format(float(Amount.from_string('1751.9'))) == '1751.90'
+    amount = Amount.from_string('1751.90')
+    assert pickle.loads(pickle.dumps(amount)).scale == 2
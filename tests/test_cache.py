@@ -0,0 +1,171 @@
+import os
+import pickle
+import shutil
+import pytest
+from ledgeroni import parser
+from ledgeroni.cache import CACHE_VERSION, ParseCache
+from ledgeroni.types import Transaction
+
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), 'sample_data')
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    for filename in os.listdir(SAMPLE_DATA):
+        shutil.copy(os.path.join(SAMPLE_DATA, filename), str(tmp_path))
+    return tmp_path
+
+
+def fail_parsing(*args, **kwargs):
+    raise AssertionError('parsed a cached file')
+
+
+def test_cold_and_warm_reads(journal_dir, monkeypatch):
+    index = str(journal_dir / 'index.ledger')
+    expected = list(parser.read_file(index))
+    cache = ParseCache()
+
+    assert list(cache.read_file(index)) == expected
+    assert (journal_dir / '.index.ledger.ledgeroni-cache').exists()
+
+    monkeypatch.setattr(parser, 'read_tokens', fail_parsing)
+    assert list(cache.read_file(index)) == expected
+
+
+def test_cache_dir(journal_dir, tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp('cache')
+    index = str(journal_dir / 'index.ledger')
+    cache = ParseCache(cache_dir=str(cache_dir))
+
+    assert list(cache.read_file(index)) == list(parser.read_file(index))
+    assert len(os.listdir(str(cache_dir))) == 6
+    assert not (journal_dir / '.index.ledger.ledgeroni-cache').exists()
+
+
+def test_included_file_changes(journal_dir):
+    index = str(journal_dir / 'index.ledger')
+    cache = ParseCache()
+    list(cache.read_file(index))
+
+    with open(str(journal_dir / 'Expenses.ledger'), 'a') as filep:
+        filep.write('2013/3/1 Bought a thing\n\tExpense:Thing\t$5\n'
+                    '\tBank:Paypal\n')
+
+    descriptions = [r.description for r in cache.read_file(index)
+                    if isinstance(r, Transaction)]
+    assert descriptions[-1] == 'Bought a thing'
+
+
+def test_touched_file_is_not_parsed(journal_dir, monkeypatch):
+    index = str(journal_dir / 'index.ledger')
+    cache = ParseCache()
+    expected = list(cache.read_file(index))
+
+    stat = os.stat(index)
+    os.utime(index, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    monkeypatch.setattr(parser, 'read_tokens', fail_parsing)
+    assert list(cache.read_file(index)) == expected
+
+
+@pytest.mark.parametrize('contents', [
+    b'garbage',
+    # Byte strings too long to exist or to allocate
+    b'\x80\x04\x8e' + b'\xff' * 8,
+    b'\x80\x04\x8e' + (1 << 62).to_bytes(8, 'little'),
+    pickle.dumps((CACHE_VERSION, 'not a record')),
+])
+def test_corrupt_cache_is_ignored(journal_dir, contents):
+    index = str(journal_dir / 'index.ledger')
+    cache = ParseCache()
+    with open(cache.cache_path(index), 'wb') as filep:
+        filep.write(contents)
+
+    assert list(cache.read_file(index)) == list(parser.read_file(index))
+
+
+def test_appended_file_parses_only_the_tail(journal_dir, monkeypatch):
+    expenses = str(journal_dir / 'Expenses.ledger')
+    cache = ParseCache()
+    list(cache.read_file(expenses))
+    resume_offset = cache.load_record(expenses).resume_offset
+
+    with open(expenses, 'a') as filep:
+        filep.write('\tExpense:Tip\t1 BTC\n2013/3/1 Bought a thing\n'
+                    '\tExpense:Thing\t$5\n\tBank:Paypal\n')
+
+    scanned = []
+    scan_buffer = parser.scan_buffer
+
+    def spy(data, *args, start=0, **kwargs):
+        scanned.append(start)
+        return scan_buffer(data, *args, start=start, **kwargs)
+
+    monkeypatch.setattr(parser, 'scan_buffer', spy)
+    result = list(cache.read_file(expenses))
+    monkeypatch.undo()
+
+    assert min(scanned) == resume_offset
+    assert result == list(parser.read_file(expenses))
+    assert len(result[-2].postings) == 3
+
+
+def test_changed_prefix_parses_everything(journal_dir):
+    income = str(journal_dir / 'Income.ledger')
+    cache = ParseCache()
+    list(cache.read_file(income))
+
+    with open(income) as filep:
+        contents = filep.read()
+    with open(income, 'w') as filep:
+        filep.write(contents.replace('$350.00', '$351.00') +
+                    '2013/3/1 Bought a thing\n\tExpense:Thing\t$5\n'
+                    '\tBank:Paypal\n')
+
+    assert list(cache.read_file(income)) == list(parser.read_file(income))
+
+
+def test_relative_paths_from_another_directory(journal_dir, monkeypatch):
+    expected = list(parser.read_file(str(journal_dir / 'index.ledger')))
+    cache = ParseCache()
+
+    monkeypatch.chdir(str(journal_dir.parent))
+    relative = os.path.join(journal_dir.name, 'index.ledger')
+    assert list(cache.read_file(relative)) == expected
+
+    monkeypatch.chdir(str(journal_dir))
+    monkeypatch.setattr(parser, 'read_tokens', fail_parsing)
+    assert list(cache.read_file('index.ledger')) == expected
+
+
+def test_edited_tail_parses_everything(tmp_path):
+    path = str(tmp_path / 'journal.ledger')
+    with open(path, 'w') as filep:
+        filep.write('2020/01/01 A\n    X:Y  $1\n    Z\n'
+                    'P 2020/01/02 00:00:00 BTC $5\n')
+    cache = ParseCache()
+    list(cache.read_file(path))
+
+    # Grows, but the last entry is replaced by a posting of the one before
+    with open(path, 'w') as filep:
+        filep.write('2020/01/01 A\n    X:Y  $1\n    Z\n    W  $0\n'
+                    '2020/01/03 B\n    X:Y  $2\n    Z\n')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    expected = list(parser.read_file(path))
+    assert len(expected) == 2
+    assert list(cache.read_file(path)) == expected
+
+
+def test_parse_errors_reach_the_caller(tmp_path):
+    path = str(tmp_path / 'bad.ledger')
+    with open(path, 'w') as filep:
+        filep.write('    C:D\n')
+    with pytest.raises(ValueError) as uncached:
+        list(parser.read_file(path))
+
+    cache = ParseCache(cache_dir=str(tmp_path / 'cache'))
+    with pytest.raises(ValueError) as cached:
+        list(cache.read_file(path))
+    assert type(cached.value) is type(uncached.value)
+    assert cached.value.args == uncached.value.args
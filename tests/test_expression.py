@@ -1,6 +1,8 @@
+from datetime import date
 import pytest
 from ledgeroni import expression
-from ledgeroni.query import Or, And, Not, RegexQuery, PayeeQuery
+from ledgeroni.query import (Or, And, Not, RegexQuery, PayeeQuery, DateQuery,
+                             MATCH_ALL)
 
 
 def test_tokenize_expression():
@@ -169,3 +171,34 @@ class TestBuildExpression:
 
         assert result == query
 
+    @pytest.mark.parametrize('term, query', [
+        ('date>=2013/02/20', DateQuery(begin=date(2013, 2, 20))),
+        ('date>2013/02/20', DateQuery(begin=date(2013, 2, 21))),
+        ('date<=2013/02/28', DateQuery(end=date(2013, 3, 1))),
+        ('date<2013/02', DateQuery(end=date(2013, 2, 1))),
+        ('date=2013-02-20', DateQuery(begin=date(2013, 2, 20),
+                                      end=date(2013, 2, 21))),
+    ])
+    def test_date(self, term, query):
+        result = expression.build_expression(term + ' and x')
+        assert result == And((RegexQuery.from_string('x'), query))
+
+    @pytest.mark.parametrize('datestr', ['2013/02/30', 'garbage'])
+    def test_invalid_date(self, datestr):
+        with pytest.raises(ValueError, match='invalid date: ' + datestr):
+            expression.build_expression('date>=' + datestr)
+
+
+class TestBuildFilterQuery:
+    def test_empty(self):
+        assert expression.build_filter_query(()) is MATCH_ALL
+
+    def test_dates(self):
+        result = expression.build_filter_query(
+            ('x', 'y'), begin=date(2013, 1, 1))
+        assert result.query == And((
+            DateQuery(begin=date(2013, 1, 1)),
+            Or((RegexQuery.from_string('y'), RegexQuery.from_string('x')))))
+
+        result = expression.build_filter_query((), end=date(2013, 1, 1))
+        assert result.query == DateQuery(end=date(2013, 1, 1))
@@ -0,0 +1,87 @@
+import os
+from datetime import datetime
+import arrow
+import pytest
+from ledgeroni import frame
+from ledgeroni.amount import Amount
+from ledgeroni.frame import JournalFrame, NO_COMMODITY
+from ledgeroni.journal import Journal
+from ledgeroni.types import Transaction, Posting, Commodity
+
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), 'sample_data')
+DOLLAR = Commodity(name='$', is_prefix=True)
+BTC = Commodity(name='BTC')
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    if request.param == 'array':
+        monkeypatch.setattr(frame, 'numpy', None)
+    elif frame.numpy is None:
+        pytest.skip('numpy is not installed')
+    return request.param
+
+
+def build_journal():
+    journal = Journal()
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Trade')
+    trans.add_posting(Posting(('Assets', 'Cash'), {DOLLAR: Amount(-1050, 2)}))
+    trans.add_posting(Posting(('Assets', 'Bitcoin'), {BTC: Amount(2, 0)}))
+    trans.add_posting(Posting(('Equity',), None))
+    journal.add_transaction(trans)
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 21)),
+                        description='Both')
+    trans.add_posting(Posting(('Assets', 'Cash'),
+                              {DOLLAR: Amount(1, 0), BTC: Amount(-5, 1)}))
+    trans.add_posting(Posting(('Equity',), {}))
+    journal.add_transaction(trans)
+    return journal
+
+
+def test_columns(backend):
+    journal = build_journal()
+    columns = JournalFrame.from_journal(journal)
+    dollar = journal.names.commodity_id(DOLLAR)
+    btc = journal.names.commodity_id(BTC)
+    equity = journal.names.account_id(('Equity',))
+
+    assert len(columns) == 7
+    assert list(columns.offsets) == [0, 4, 7]
+    assert list(columns.trans) == [0, 0, 0, 0, 1, 1, 1]
+    assert list(columns.posting) == [0, 1, 2, 2, 0, 0, 1]
+    assert list(columns.account)[2:4] == [equity, equity]
+    assert list(columns.commodity) == [dollar, btc, dollar, btc, dollar, btc,
+                                       NO_COMMODITY]
+    assert columns.scales == [2, 1]
+    assert list(columns.amount) == [-1050, 20, 1050, -20, 100, -5, 0]
+    assert list(columns.auto) == [False, False, True, True,
+                                  False, False, False]
+    assert columns.date[0] == datetime(2013, 2, 20).toordinal()
+    assert columns.amount_at(1) == 2
+
+
+def test_round_trip(backend):
+    journal = build_journal()
+    columns = JournalFrame.from_journal(journal)
+    assert list(columns.transactions()) == journal.transactions
+
+
+def test_large_amounts(backend):
+    journal = Journal()
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Big')
+    trans.add_posting(Posting(('Assets',), {DOLLAR: Amount(10 ** 30, 2)}))
+    trans.add_posting(Posting(('Equity',), None))
+    journal.add_transaction(trans)
+    columns = JournalFrame.from_journal(journal)
+    assert columns.amount_at(1) == Amount(-10 ** 30, 2)
+    assert list(columns.transactions()) == journal.transactions
+
+
+def test_from_file(backend):
+    filename = os.path.join(SAMPLE_DATA, 'index.ledger')
+    journal = Journal()
+    journal.add_from_file(filename)
+    columns = JournalFrame.from_file(filename)
+    assert list(columns.transactions()) == journal.transactions
@@ -0,0 +1,83 @@
+import os
+import pickle
+from datetime import datetime
+import arrow
+from ledgeroni import parser
+from ledgeroni.interning import InternTable
+from ledgeroni.journal import Journal
+from ledgeroni.types import (Transaction, Posting, Commodity,
+                             INTEGER_COMMODITY)
+
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), 'sample_data')
+
+
+def test_commodity():
+    names = InternTable()
+    dollar = names.commodity('$', True)
+    assert dollar == Commodity(name='$', is_prefix=True)
+    assert names.commodity('$', True) is dollar
+    assert names.commodity('$') is not dollar
+    assert names.intern_commodity(Commodity('$', True)) is dollar
+    assert names.intern_commodity(INTEGER_COMMODITY) is INTEGER_COMMODITY
+
+
+def test_commodity_hash_survives_pickling():
+    dollar = Commodity(name='$', is_prefix=True)
+    assert hash(pickle.loads(pickle.dumps(dollar))) == hash(dollar)
+
+
+def test_account():
+    names = InternTable()
+    food = names.account('Expenses:Food')
+    assert food == ('Expenses', 'Food')
+    assert names.account('Expenses:Food') is food
+    assert names.intern_account(('Expenses', 'Food')) is food
+    assert names.account_id(food) == 0
+    assert names.account_id(names.account('Assets:Cash')) == 1
+    assert names.accounts == [food, ('Assets', 'Cash')]
+
+
+def test_intern_posting():
+    names = InternTable()
+    dollar = names.commodity('$', True)
+    food = names.account('Expenses:Food')
+    posting = Posting(account=food, amounts={dollar: 10})
+    assert names.intern_posting(posting) is posting
+
+    copied = pickle.loads(pickle.dumps(posting))
+    interned = names.intern_posting(copied)
+    assert interned == posting
+    assert interned.account is food
+    assert list(interned.amounts) == [dollar]
+    assert all(k is dollar for k in interned.amounts)
+
+    auto = Posting(account=('Expenses', 'Food'), amounts=None)
+    assert names.intern_posting(auto).account is food
+
+
+def test_read_file_shares_values():
+    names = InternTable()
+    results = parser.read_file(os.path.join(SAMPLE_DATA, 'index.ledger'),
+                               names=names)
+    postings = [p for r in results if isinstance(r, Transaction)
+                for p in r.postings]
+    accounts = {id(p.account) for p in postings}
+    commodities = {id(c) for p in postings if p.amounts for c in p.amounts}
+    assert len(accounts) == len({p.account for p in postings})
+    assert len(accounts) == len(names.accounts)
+    assert len(commodities) == len({c for p in postings if p.amounts
+                                    for c in p.amounts})
+
+
+def test_journal_interns_added_transactions():
+    journal = Journal()
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Lunch')
+    trans.add_posting(Posting(account=('Expenses', 'Food'),
+                              amounts={Commodity('$', True): 10}))
+    trans.add_posting(Posting(account=('Assets', 'Cash'), amounts=None))
+    journal.add_transaction(trans)
+
+    assert trans.postings[0].account is journal.names.account('Expenses:Food')
+    assert next(iter(trans.postings[0].amounts)) is (
+        journal.names.commodity('$', True))
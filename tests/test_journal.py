@@ -1,8 +1,9 @@
 import re
-from datetime import datetime
+from datetime import date, datetime
 import arrow
 from ledgeroni.journal import Journal
-from ledgeroni.query import And, Or, Not, RegexQuery, PayeeQuery
+from ledgeroni.query import And, Or, Not, RegexQuery, PayeeQuery, DateQuery
+from ledgeroni.sorter import JournalSorter
 from ledgeroni.types import Transaction, Posting, Commodity
 
 def test_add_transaction():
@@ -78,3 +79,89 @@ class TestTransactionsMatching:
 
         assert trans not in journal.transactions_matching(
                 query=RegexQuery(re.compile('Reddit')))
+
+
+def build_indexed_journal():
+    journal = Journal()
+    for day, accounts in enumerate([
+            [('Expenses', 'Travel', 'Hotels'), ('Assets', 'Bank')],
+            [('Expenses', 'Food'), ('Assets', 'Cash')],
+            [('Expenses', 'Travel', 'Flights'), ('Expenses', 'Travel'),
+             ('Assets', 'Bank')]]):
+        trans = Transaction(date=arrow.get(datetime(2013, 2, 20 - day)),
+                            description='Transaction {}'.format(day))
+        for account in accounts[:-1]:
+            trans.add_posting(Posting(account, {None: 1}))
+        trans.add_posting(Posting(accounts[-1], None))
+        journal.add_transaction(trans)
+    return journal
+
+
+class TestAccountIndex:
+    def test_index(self):
+        journal = build_indexed_journal()
+        assert journal.account_index[('Expenses',)] == [0, 1, 2]
+        assert journal.account_index[('Expenses', 'Travel')] == [0, 2]
+        assert journal.account_index[('Expenses', 'Travel', 'Hotels')] == [0]
+        assert journal.account_index[('Assets', 'Bank')] == [0, 2]
+
+    def test_transactions_with_accounts(self):
+        journal = build_indexed_journal()
+        assert journal.transactions_with_accounts([
+            ('Expenses', 'Travel', 'Hotels'), ('Expenses', 'Food')]) == [0, 1]
+        assert journal.transactions_with_accounts([
+            ('Expenses', 'Travel'), ('Expenses', 'Travel', 'Flights')]) == [2]
+        assert journal.transactions_with_accounts([('Income',)]) == []
+
+    def test_transactions_with_accounts_is_a_copy(self):
+        journal = build_indexed_journal()
+        hotels = ('Expenses', 'Travel', 'Hotels')
+        journal.transactions_with_accounts([hotels]).append(5)
+        assert journal.transactions_with_accounts([hotels]) == [0]
+
+    def test_rebuild_after_sort(self):
+        journal = build_indexed_journal()
+        JournalSorter.from_term_list(['d']).sort_journal(journal)
+        assert journal.account_index[('Expenses', 'Travel', 'Hotels')] == [2]
+        assert journal.account_index[('Expenses', 'Food')] == [1]
+
+    def test_candidates(self):
+        journal = build_indexed_journal()
+        for query in [
+                RegexQuery(re.compile('Hotels|Food')),
+                And((RegexQuery(re.compile('Travel')),
+                     Not(RegexQuery(re.compile('Hotels'))))),
+                Or((RegexQuery(re.compile('Cash')),
+                    PayeeQuery(RegexQuery(re.compile('2'))))),
+                Or((RegexQuery(re.compile('Cash')),
+                    RegexQuery(re.compile('Flights')))).compile()]:
+            assert list(journal.transactions_matching(query)) == [
+                t for t in journal.transactions if query.execute(t)]
+        assert RegexQuery(re.compile('Hotels|Food')).candidates(
+            journal) == [0, 1]
+        assert Not(RegexQuery(re.compile('Food'))).candidates(journal) is None
+
+    def test_payee_candidates(self):
+        journal = build_indexed_journal()
+        query = PayeeQuery(RegexQuery(re.compile('transaction 1', re.I)))
+        assert query.candidates(journal) == [1]
+        assert list(journal.transactions_matching(query)) == [
+            journal.transactions[1]]
+
+    def test_transactions_between(self):
+        journal = build_indexed_journal()
+        assert not journal.dates_sorted
+        assert journal.transactions_between(None, None) == [0, 1, 2]
+        assert journal.transactions_between(date(2013, 2, 19), None) == [0, 1]
+        assert journal.transactions_between(None, date(2013, 2, 19)) == [2]
+        assert journal.transactions_between(
+            date(2013, 2, 19), date(2013, 2, 20)) == [1]
+        assert journal.transactions_between(date(2014, 1, 1), None) == []
+
+    def test_date_candidates(self):
+        journal = build_indexed_journal()
+        query = And((DateQuery(end=date(2013, 2, 20)),
+                     RegexQuery(re.compile('Travel'))))
+        assert query.candidates(journal) == [2]
+        assert list(journal.transactions_matching(query.compile())) == [
+            journal.transactions[2]]
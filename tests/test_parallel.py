@@ -0,0 +1,60 @@
+import os
+import pytest
+from ledgeroni import parallel, parser
+
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), 'sample_data')
+
+
+@pytest.fixture
+def journal(tmp_path):
+    "A single journal file mixing directives and transactions"
+    path = tmp_path / 'journal.ledger'
+    with open(str(path), 'w') as out:
+        for filename in ('prices_db', 'Income.ledger', 'Bitcoin.ledger',
+                         'Payable.ledger', 'Receivable.ledger',
+                         'Expenses.ledger'):
+            with open(os.path.join(SAMPLE_DATA, filename)) as filep:
+                out.write(filep.read() + '\n')
+    return str(path)
+
+
+def test_split_buffer(journal, monkeypatch):
+    monkeypatch.setattr(parallel, 'MIN_CHUNK_SIZE', 64)
+    with open(journal, 'rb') as filep:
+        data = filep.read()
+    ranges = parallel.split_buffer(data, 8)
+
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[start - 1:start] == b'\n'
+        assert parser.next_entry_offset(data, start) == start
+
+
+def test_read_split_file(journal, monkeypatch):
+    monkeypatch.setattr(parallel, 'MIN_CHUNK_SIZE', 64)
+    assert (list(parallel.read_files([journal], 2)) ==
+            list(parser.read_file(journal)))
+
+
+def test_read_files_with_includes():
+    filenames = [os.path.join(SAMPLE_DATA, 'prices_db'),
+                 os.path.join(SAMPLE_DATA, 'index.ledger'),
+                 os.path.join(SAMPLE_DATA, 'Income.ledger')]
+    expected = [r for filename in filenames
+                for r in parser.read_file(filename)]
+    assert list(parallel.read_files(filenames, 2)) == expected
+
+
+def test_file_included_twice_gets_new_objects(tmp_path):
+    (tmp_path / 'a.ledger').write_text(
+        '2013/01/01 A\n    Expenses:Food    $5\n    Assets:Cash\n')
+    index = tmp_path / 'index.ledger'
+    index.write_text('include a.ledger\ninclude a.ledger\n')
+
+    first, second = parallel.read_files([str(index)], 2)
+    assert first == second
+    assert first is not second
+    assert first.postings[0] is not second.postings[0]
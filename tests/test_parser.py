@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from datetime import datetime
 from fractions import Fraction
@@ -21,6 +23,41 @@ class TestParserMethods(unittest.TestCase):
         res = list(parser.remove_empty_lines(('line', '', 'lines')))
         self.assertEqual(res, ['line', 'lines'])
 
+    def test_scan_buffer(self):
+        data = (b'; Income\n2011/11/21 Payment # memo\n\tBank:Paypal\t$350.00\n'
+                b'\n  ; indented comment\n\tIncome:Hard Work  \nP 2012/11/25'
+                b' 05:04:00 AU $1751.90')
+        res = list(parser.scan_buffer(data))
+        self.assertEqual(res, [
+            (parser.TRANSACTION_LINE, '2011/11/21 Payment'),
+            (parser.POSTING_LINE, '\tBank:Paypal\t$350.00'),
+            (parser.POSTING_LINE, '\tIncome:Hard Work'),
+            (parser.PRICE_LINE, 'P 2012/11/25 05:04:00 AU $1751.90')])
+
+    def test_scan_file_matches_line_pipeline(self):
+        filename = 'tests/sample_data/index.ledger'
+        lines = parser.remove_empty_lines(parser.remove_comments(
+            parser.load_lines(filename)))
+        res = [line for _, line in parser.scan_file(filename)]
+        self.assertEqual(res, list(lines))
+
+    def test_scan_empty_file(self):
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.assertEqual(list(parser.scan_file(filename)), [])
+        finally:
+            os.remove(filename)
+
+    def test_parse_date(self):
+        for datestr in ('2013/2/20', '2013-02-20', '2012/11/25 05:04:00',
+                        '2013.02.20', '20130220'):
+            self.assertEqual(parser.parse_date(datestr), arrow.get(datestr))
+        self.assertIs(parser.parse_date('2013/2/20'),
+                      parser.parse_date('2013/2/20'))
+        with self.assertRaises(ValueError):
+            parser.parse_date('2013/2/30')
+
     def test_read_transaction_line(self):
         transaction = parser.read_transaction_line(
                 '2013/2/20 Purchased reddit gold for the year')
@@ -0,0 +1,63 @@
+import re
+import pytest
+from ledgeroni.payees import PayeeIndex, required_literal, trigrams
+
+
+def build_index():
+    index = PayeeIndex()
+    for position, description in enumerate([
+            'Amazon', 'Grocery store', 'AMAZON MARKETPLACE', 'Amazon',
+            'Café Amazonia', 'Joe']):
+        index.add(description, position)
+    return index
+
+
+def test_trigrams():
+    assert trigrams('amazon') == {'ama', 'maz', 'azo', 'zon'}
+    assert trigrams('am') == set()
+
+
+@pytest.mark.parametrize('pattern, flags, literal', [
+    ('Amazon', re.I, 'amazon'),
+    ('Amazon Prime', 0, 'amazon prime'),
+    ('Ama.on', re.I, None),
+    ('Amazon|Joe', re.I, None),
+    ('Amazon', re.X, None),
+    ('Café', re.I, None),
+])
+def test_required_literal(pattern, flags, literal):
+    assert required_literal(re.compile(pattern, flags)) == literal
+
+
+def test_positions():
+    index = build_index()
+    assert index.positions['Amazon'] == [0, 3]
+    assert len(index.positions) == 5
+
+
+@pytest.mark.parametrize('pattern, flags', [
+    ('amazon', re.I), ('Amazon', 0), ('azon', re.I), ('zon', 0),
+    ('am.zon', re.I), ('joe', re.I), ('xyz', re.I), ('^Am', 0), ('jo', 0)])
+def test_matching(pattern, flags):
+    index = build_index()
+    regex = re.compile(pattern, flags)
+    expected = sorted(p for d, positions in index.positions.items()
+                      for p in positions if regex.search(d))
+    assert index.matching(regex) == expected
+
+
+def test_matching_is_a_copy():
+    index = build_index()
+    index.matching(re.compile('^Amazon$')).append(5)
+    assert index.positions['Amazon'] == [0, 3]
+
+
+def test_trigrams_indexed_lazily():
+    index = build_index()
+    assert not index.trigrams
+    index.matching(re.compile('amazon', re.I))
+    assert index.trigrams['ama'] == {'Amazon', 'AMAZON MARKETPLACE'}
+    assert index.unindexed == ['Café Amazonia']
+
+    index.add('Amazing', 6)
+    assert index.matching(re.compile('amaz', re.I)) == [0, 2, 3, 4, 6]
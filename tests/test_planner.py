@@ -0,0 +1,117 @@
+import os
+import re
+from datetime import date
+import pytest
+from ledgeroni import expression
+from ledgeroni.journal import Journal
+from ledgeroni.planner import Planner, QueryStats, describe, leaf_cost
+from ledgeroni.query import (And, Or, Not, RegexQuery, PayeeQuery, DateQuery,
+                             MATCH_ALL)
+
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), 'sample_data')
+CHEAP = RegexQuery(re.compile('Cheap'))
+RARE = RegexQuery(re.compile('Rare'))
+COMMON = RegexQuery(re.compile('Common'))
+SLOW = PayeeQuery(RegexQuery(re.compile('Slow')))
+
+
+@pytest.fixture
+def journal():
+    journal = Journal()
+    journal.add_from_file(os.path.join(SAMPLE_DATA, 'index.ledger'))
+    return journal
+
+
+def planner_with_stats():
+    planner = Planner(Journal())
+    planner.stats.update({
+        CHEAP: QueryStats(rate=0.5, cost=1.0),
+        RARE: QueryStats(rate=0.01, cost=1.5),
+        COMMON: QueryStats(rate=0.99, cost=2.0),
+        SLOW: QueryStats(rate=0.01, cost=100.0),
+    })
+    return planner
+
+
+def test_plan_and():
+    planner = planner_with_stats()
+    planned = planner.plan(And((COMMON, And((SLOW, CHEAP)), RARE)))
+    assert planned == And((RARE, CHEAP, SLOW, COMMON))
+
+
+def test_plan_or():
+    planner = planner_with_stats()
+    planned = planner.plan(Or((RARE, Not(Or((SLOW, COMMON))), CHEAP)))
+    assert planned == Or((CHEAP, RARE, Not(Or((COMMON, SLOW)))))
+
+
+def test_estimate():
+    planner = planner_with_stats()
+    stats = planner.estimate(And((CHEAP, RARE)))
+    assert stats.rate == pytest.approx(0.005)
+    assert stats.cost == pytest.approx(1.0 + 0.5 * 1.5)
+    stats = planner.estimate(Or((CHEAP, RARE)))
+    assert stats.rate == pytest.approx(1 - 0.5 * 0.99)
+    assert stats.cost == pytest.approx(1.0 + 0.5 * 1.5)
+
+
+def test_plan_keeps_results(journal):
+    planner = Planner(journal)
+    for expr in ['Expense and not Reddit or @Client',
+                 'not ( Bank or Bitcoin ) and ( Expense or Income )',
+                 'Asset or Bank and date>=2012/07/01']:
+        query = expression.build_filter_query([expr])
+        planned = planner.plan(query)
+        assert planned.compile() is planned
+        assert [t.header for t in journal.transactions_matching(planned)] == [
+            t.header for t in journal.transactions_matching(query)]
+
+
+def test_measure(journal):
+    planner = Planner(journal)
+    stats = planner.estimate(RegexQuery(re.compile('Bitcoin')))
+    postings = sum(len(t.postings) for t in journal.transactions)
+    assert stats.rate == pytest.approx(3 / postings)
+    assert stats.cost == 1.0
+    assert Planner(Journal()).estimate(CHEAP) == QueryStats(0.0, 0.0)
+
+
+def test_plan_match_all(journal):
+    assert Planner(journal).plan(MATCH_ALL) is MATCH_ALL
+
+
+def test_explain(journal):
+    planner = Planner(journal)
+    query = planner.plan(expression.build_filter_query(
+        ['Bitcoin and @Purchased']))
+    lines = planner.explain(query)
+    assert lines[0] == 'visits 2 of 7 transactions'
+    assert lines[1].startswith('and ')
+    assert sorted(line.split()[0:2] for line in lines[2:]) == [
+        ['account', '/Bitcoin/'], ['payee', '/Purchased/']]
+
+
+def test_leaf_cost():
+    assert leaf_cost(CHEAP) < leaf_cost(SLOW)
+    assert leaf_cost(Not(SLOW)) == leaf_cost(SLOW)
+    assert leaf_cost(MATCH_ALL) == 0.0
+
+
+def test_plans_are_reproducible(journal):
+    query = expression.build_filter_query(
+        ['Expense and @Purchased and Bank and date>=2012/07/01'])
+    first, second = Planner(journal), Planner(journal)
+    assert first.plan(query) == second.plan(query)
+    assert (first.explain(first.plan(query)) ==
+            second.explain(second.plan(query)))
+
+
+@pytest.mark.parametrize('query, description', [
+    (CHEAP, 'account /Cheap/'),
+    (SLOW, 'payee /Slow/'),
+    (DateQuery(begin=date(2013, 1, 1)), 'date [2013-01-01, )'),
+    (Not(CHEAP), 'not'),
+    (MATCH_ALL, 'everything'),
+])
+def test_describe(query, description):
+    assert describe(query) == description
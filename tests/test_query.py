@@ -1,7 +1,10 @@
-from datetime import datetime
+from datetime import date, datetime
 from fractions import Fraction
 import arrow
-from ledgeroni.query import And, Or, Not, RegexQuery, PayeeQuery
+import pytest
+from ledgeroni.query import (And, Or, Not, RegexQuery, PayeeQuery, DateQuery,
+                             MATCH_ALL, is_mergeable, merge_regexes,
+                             iter_bits)
 from ledgeroni.types import Transaction, Posting, Commodity
 import re
 
@@ -97,3 +100,99 @@ def test_payee():
 
     assert q.execute(TRANS_1)
     assert not q.execute(TRANS_2)
+
+
+def test_date():
+    assert DateQuery(begin=date(2013, 2, 20)).execute(TRANS_1) == {0, 1}
+    assert DateQuery(end=date(2013, 2, 21)).execute_mask(TRANS_1) == 0b11
+    assert not DateQuery(end=date(2013, 2, 20)).execute(TRANS_1)
+    assert not DateQuery(begin=date(2013, 2, 21)).matches(TRANS_1)
+
+
+COMPILE_QUERIES = [
+    RegexQuery(re.compile('Expense')),
+    And((RegexQuery(re.compile('Expense')), RegexQuery(re.compile('Reddit')))),
+    Or((RegexQuery(re.compile('Digg')), RegexQuery(re.compile('Reddit')))),
+    Or((RegexQuery(re.compile('digg', re.I)),
+        Or((RegexQuery(re.compile('Reddit')),
+            RegexQuery(re.compile('(Cool)')))),
+        RegexQuery(re.compile('paypal', re.I)))),
+    Not(RegexQuery(re.compile('Asset'))),
+    And((Not(Or((RegexQuery(re.compile('Asset')),
+                 PayeeQuery(RegexQuery(re.compile('favor')))))),
+         RegexQuery(re.compile('e')), RegexQuery(re.compile('r')))),
+    PayeeQuery(RegexQuery(re.compile('reddit'))),
+    And((DateQuery(begin=date(2013, 2, 1), end=date(2013, 2, 21)),
+         RegexQuery(re.compile('Expense')))),
+]
+
+
+@pytest.mark.parametrize('query', COMPILE_QUERIES)
+def test_compile(query):
+    compiled = query.compile()
+    for trans in (TRANS_1, TRANS_2, TRANS_3, TRANS_4, TRANS_5):
+        assert compiled.execute(trans) == query.execute(trans)
+        assert compiled.matches(trans) == bool(query.execute(trans))
+        assert list(compiled.postings_matching(trans)) == list(
+            query.postings_matching(trans))
+    assert compiled.compile() is compiled
+
+
+def test_compile_match_all():
+    assert MATCH_ALL.compile() is MATCH_ALL
+
+
+def test_merge_regexes():
+    merged = merge_regexes([re.compile('a'), re.compile('b|c'),
+                            re.compile('d', re.I)])
+    assert [r.pattern for r in merged] == ['(?:a)|(?:b|c)', 'd']
+    assert merged[1].flags & re.I
+
+    assert is_mergeable(RegexQuery(re.compile('a.c')))
+    assert not is_mergeable(RegexQuery(re.compile('(a)c')))
+    assert not is_mergeable(RegexQuery(re.compile('(?i)ac')))
+    assert not is_mergeable(PayeeQuery(RegexQuery(re.compile('a'))))
+
+
+class CountingRegex:
+    "Wraps a regex, counting how many times it searches"
+    def __init__(self, pattern):
+        self.regex = re.compile(pattern)
+        self.searches = 0
+
+    def search(self, string):
+        self.searches += 1
+        return self.regex.search(string)
+
+
+def test_regex_query_memoizes_accounts():
+    regex = CountingRegex('Asset')
+    q = RegexQuery(regex)
+    for trans in (TRANS_1, TRANS_3, TRANS_5, TRANS_1):
+        q.execute(trans)
+    assert regex.searches == 5
+    assert q.memo[('Asset', 'Bitcoin Wallet')]
+    assert not q.memo[('Expense', 'Web Services', 'Reddit')]
+
+    match = q.matcher()
+    assert [match(TRANS_5, p) for p in TRANS_5.postings] == [True, True]
+    assert [match(TRANS_4, p) for p in TRANS_4.postings] == [False, False]
+    assert regex.searches == 7
+    assert q == RegexQuery(regex)
+
+
+@pytest.mark.parametrize('query', COMPILE_QUERIES + [MATCH_ALL])
+def test_execute_mask(query):
+    for q in (query, query.compile()):
+        for trans in (TRANS_1, TRANS_2, TRANS_3, TRANS_4, TRANS_5):
+            selected = q.execute(trans)
+            assert q.execute_mask(trans) == sum(1 << i for i in selected)
+            assert q.matches(trans) == bool(selected)
+            assert list(q.postings_matching(trans)) == [
+                trans.postings[i] for i in sorted(selected)]
+
+
+def test_iter_bits():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b101001)) == [0, 3, 5]
+    assert list(iter_bits(1 << 70)) == [70]
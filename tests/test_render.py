@@ -0,0 +1,112 @@
+import io
+import re
+from datetime import datetime
+import arrow
+from colorama import Fore, Style
+from ledgeroni import render
+from ledgeroni.amount import Amount
+from ledgeroni.commands.register import build_table, limit_rows
+from ledgeroni.render import Renderer
+from ledgeroni.running import RegisterRow
+from ledgeroni.types import Transaction, Commodity, INTEGER_COMMODITY
+
+ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+DOLLAR = Commodity(name='$', is_prefix=True)
+BTC = Commodity(name=' BTC')
+
+
+class TTY(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def test_color_detection():
+    assert not Renderer(io.StringIO()).color
+    assert Renderer(TTY()).color
+    assert not Renderer(TTY(), color=False).color
+    assert Renderer(io.StringIO(), color=True).color
+
+
+def test_amount():
+    renderer = Renderer(io.StringIO())
+    assert renderer.amount(DOLLAR, Amount(-1050, 2)) == '{:>20}'.format(
+        '$-10.50')
+    assert renderer.amount(BTC, Amount(2)) == '{:>20}'.format('2.00 BTC')
+    assert renderer.amount(INTEGER_COMMODITY, Amount(7)) == '{:>20}'.format(
+        '7.00')
+    assert renderer.amount(None, Amount(15, 1)) == '{:>20}'.format('1.5')
+    assert renderer.formatter(DOLLAR) is renderer.formatter(DOLLAR)
+
+    colored = Renderer(io.StringIO(), color=True)
+    assert colored.amount(DOLLAR, Amount(-1)) == (
+        Fore.RED + '{:>20}'.format('$-1.00') + Style.RESET_ALL)
+    assert colored.amount(DOLLAR, Amount(1)) == '{:>20}'.format('$1.00')
+
+
+def test_style():
+    assert Renderer(io.StringIO()).pad('', 'Food', 6) == 'Food  '
+    colored = Renderer(io.StringIO(), color=True)
+    assert colored.pad(colored.blue, 'Food', 6) == (
+        Fore.BLUE + 'Food' + Style.RESET_ALL + '  ')
+    assert colored.style(colored.bright, '') == Style.BRIGHT + Style.RESET_ALL
+
+
+def test_register_table():
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Trade')
+    rows = [RegisterRow('Assets:Cash', [(DOLLAR, Amount(-10))],
+                        [(DOLLAR, Amount(-10))]),
+            RegisterRow('Assets:Bitcoin', [(BTC, Amount(1))],
+                        [(DOLLAR, Amount(-10)), (BTC, Amount(1))]),
+            RegisterRow('Equity', [], [])]
+    plain = list(build_table(trans, rows, Renderer(io.StringIO())))
+    colored = list(build_table(trans, rows,
+                               Renderer(io.StringIO(), color=True)))
+    assert [ANSI_RE.sub('', line) for line in colored] == plain
+    # The columns are as wide as the colored ones used to be padded to
+    assert colored[0] == '{:<64} {:<50} {} {}'.format(
+        '2013/02/20 ' + Style.BRIGHT + 'Trade' + Style.RESET_ALL,
+        Fore.BLUE + 'Assets:Cash' + Style.RESET_ALL,
+        Fore.RED + '{:>20}'.format('$-10.00') + Style.RESET_ALL,
+        Fore.RED + '{:>20}'.format('$-10.00') + Style.RESET_ALL)
+    assert len(plain) == 4
+    assert plain[2].startswith(' ' * 56 + ' ' + ' ' * 41 + ' ')
+    assert plain[3] == '{:<56} {:<41} {} {}'.format(
+        '', 'Equity', ' ' * 20, '{:>20}'.format('0'))
+
+
+def test_buffering(monkeypatch):
+    monkeypatch.setattr(render, 'BUFFER_SIZE', 10)
+    stream = io.StringIO()
+    with Renderer(stream) as renderer:
+        renderer.write('1234')
+        assert stream.getvalue() == ''
+        renderer.write('567890')
+        assert stream.getvalue() == '1234\n567890\n'
+        renderer.write('last')
+    assert stream.getvalue() == '1234\n567890\nlast\n'
+
+
+def test_line_buffering():
+    for renderer in [Renderer(TTY()),
+                     Renderer(io.StringIO(), line_buffered=True)]:
+        renderer.write('first')
+        assert renderer.stream.getvalue() == ''
+        renderer.end_entry()
+        assert renderer.stream.getvalue() == 'first\n'
+
+    renderer = Renderer(io.StringIO())
+    assert not renderer.line_buffered
+    assert not Renderer(TTY(), line_buffered=False).line_buffered
+    renderer.write('first')
+    renderer.end_entry()
+    assert renderer.stream.getvalue() == ''
+
+
+def test_limit_rows_keeps_transactions_apart():
+    "The same transaction object twice in a row is still two transactions"
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Trade')
+    rows = [RegisterRow('Assets:Cash', [], []), RegisterRow('Equity', [], [])]
+    limited = list(limit_rows([(trans, rows), (trans, rows)], head=3))
+    assert limited == [(trans, rows), (trans, rows[:1])]
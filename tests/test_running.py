@@ -0,0 +1,71 @@
+import os
+import re
+from datetime import datetime
+import arrow
+import pytest
+from ledgeroni import running
+from ledgeroni.amount import Amount
+from ledgeroni.frame import JournalFrame
+from ledgeroni.journal import Journal
+from ledgeroni.query import RegexQuery, Not, PayeeQuery, MATCH_ALL
+from ledgeroni.running import RegisterRow, generate_running_totals
+from ledgeroni.types import Transaction, Posting, Commodity
+
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), 'sample_data')
+DOLLAR = Commodity(name='$', is_prefix=True)
+BTC = Commodity(name='BTC')
+
+
+@pytest.fixture(params=['numpy', 'python', 'small blocks'])
+def backend(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(running, 'numpy', None)
+    elif running.numpy is None:
+        pytest.skip('numpy is not installed')
+    if request.param == 'small blocks':
+        monkeypatch.setattr(running, 'BLOCK_SIZE', 2)
+    return request.param
+
+
+def dict_rows(journal, query):
+    return [(transaction, [
+        RegisterRow(name, list(changes.items()), list(totals.items()))
+        for name, (changes, totals) in postings.items()])
+            for transaction, postings
+            in journal.generate_running_total_report(query)]
+
+
+@pytest.mark.parametrize('query', [
+    MATCH_ALL, Not(RegexQuery(re.compile('Asset'))),
+    PayeeQuery(RegexQuery(re.compile('Client')))])
+def test_matches_dict_report(backend, query):
+    journal = Journal()
+    journal.add_from_file(os.path.join(SAMPLE_DATA, 'index.ledger'))
+    journal.add_from_file(os.path.join(SAMPLE_DATA, 'Triple.ledger'))
+    frame = JournalFrame.from_journal(journal)
+
+    expected = dict_rows(journal, query)
+    result = list(generate_running_totals(frame, journal.transactions, query))
+    assert [t.header for t, _ in result] == [t.header for t, _ in expected]
+    assert [rows for _, rows in result] == [rows for _, rows in expected]
+
+
+def test_repeated_account(backend):
+    journal = Journal()
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Split')
+    trans.add_posting(Posting(('Assets', 'Cash'), {DOLLAR: Amount(-5)}))
+    trans.add_posting(Posting(('Expenses',), {BTC: Amount(1)}))
+    trans.add_posting(Posting(('Assets', 'Cash'), {DOLLAR: Amount(-3)}))
+    trans.add_posting(Posting(('Equity',), None))
+    journal.add_transaction(trans)
+    frame = JournalFrame.from_journal(journal)
+
+    (_, rows), = generate_running_totals(frame, journal.transactions,
+                                         MATCH_ALL)
+    assert rows == dict_rows(journal, MATCH_ALL)[0][1]
+    assert [row.account_name for row in rows] == [
+        'Assets:Cash', 'Expenses', 'Equity']
+    assert rows[0].changes == [(DOLLAR, -3)]
+    assert rows[0].totals == [(DOLLAR, -8), (BTC, 1)]
+    assert rows[2].totals == []
@@ -0,0 +1,48 @@
+import os
+from ledgeroni.interning import InternTable
+from ledgeroni.journal import Journal
+from ledgeroni.stream import read_transactions
+
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), 'sample_data')
+
+UNBALANCED = '''\
+2013/02/20 Balanced
+    Expenses:Food    $10
+    Assets:Cash
+
+2013/02/21 Unbalanced
+    Expenses:Food    $10
+    Assets:Cash      -$5
+
+P 2013/02/22 00:00:00 BTC $100
+
+2013/02/23 Balanced again
+    Expenses:Food    $5
+    Assets:Cash      -$5
+'''
+
+
+def test_read_transactions():
+    filenames = [os.path.join(SAMPLE_DATA, 'prices_db'),
+                 os.path.join(SAMPLE_DATA, 'index.ledger')]
+    journal = Journal()
+    journal.add_from_files(filenames)
+    errors = []
+    names = InternTable()
+    transactions = list(read_transactions(filenames, errors, names))
+    assert transactions == journal.transactions
+    assert [t.calc_totals() for t in transactions] == [
+        t.calc_totals() for t in journal.transactions]
+    assert errors == []
+    assert ('Asset', 'Bitcoin Wallet') in names.account_names.values()
+
+
+def test_unbalanced(tmp_path):
+    filename = tmp_path / 'unbalanced.ledger'
+    filename.write_text(UNBALANCED)
+    errors = []
+    transactions = list(read_transactions([str(filename)], errors))
+    assert [t.description for t in transactions] == [
+        'Balanced', 'Balanced again']
+    assert transactions[0].calc_totals().postings[1].amounts
+    assert [t.description for t in errors] == ['Unbalanced']
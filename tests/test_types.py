@@ -0,0 +1,101 @@
+import copy
+import pickle
+from dataclasses import FrozenInstanceError
+from datetime import datetime
+import arrow
+import pytest
+from ledgeroni.types import Transaction, Posting, Commodity
+
+DOLLAR = Commodity(name='$', is_prefix=True)
+BTC = Commodity(name='BTC')
+
+
+def test_posting_amounts():
+    single = Posting(account=('Assets', 'Cash'), amounts={DOLLAR: 10})
+    assert single.amounts == {DOLLAR: 10}
+    assert list(single.amount_items()) == [(DOLLAR, 10)]
+    assert not single.is_auto
+
+    multi = Posting(account=('Assets', 'Cash'), amounts={DOLLAR: 10, BTC: 1})
+    assert multi.amounts == {DOLLAR: 10, BTC: 1}
+    assert list(multi.amount_items()) == [(DOLLAR, 10), (BTC, 1)]
+
+    auto = Posting(account=('Assets', 'Cash'), amounts=None)
+    assert auto.amounts is None
+    assert list(auto.amount_items()) == []
+    assert auto.is_auto
+
+    empty = Posting(account=('Assets', 'Cash'))
+    assert empty.amounts == {}
+    assert not empty.is_auto
+
+
+def test_posting_equality():
+    posting = Posting(account=('Assets', 'Cash'), amounts={DOLLAR: 10})
+    assert posting == Posting(('Assets', 'Cash'), {DOLLAR: 10})
+    assert posting != Posting(('Assets', 'Cash'), {DOLLAR: 11})
+    assert posting != Posting(('Assets', 'Cash'), None)
+    assert hash(posting) == hash(Posting(('Assets', 'Cash'), {DOLLAR: 10}))
+    assert repr(posting) == ("Posting(account=('Assets', 'Cash'), amounts="
+                             "{Commodity(name='$', is_prefix=True): 10})")
+
+
+def test_posting_is_frozen():
+    posting = Posting(account=('Assets', 'Cash'), amounts={DOLLAR: 10})
+    with pytest.raises(FrozenInstanceError):
+        posting.account = ('Assets', 'Bank')
+
+
+@pytest.mark.parametrize('amounts', [{DOLLAR: 10}, {DOLLAR: 10, BTC: 1},
+                                     None, {}])
+def test_posting_pickle(amounts):
+    posting = Posting(account=('Assets', 'Cash'), amounts=amounts)
+    restored = pickle.loads(pickle.dumps(posting))
+    assert restored == posting
+    assert restored.amounts == amounts
+
+
+def test_transaction():
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Lunch')
+    trans.add_posting(Posting(('Expenses', 'Food'), {DOLLAR: 10}))
+    trans.add_posting(Posting(('Assets', 'Cash'), None))
+    assert trans.postings[1].is_auto
+    assert not hasattr(trans, '__dict__')
+
+    assert copy.copy(trans) == trans
+    assert pickle.loads(pickle.dumps(trans)) == trans
+    assert trans.calc_totals().postings[1].amounts == {DOLLAR: -10}
+    assert trans.postings[1].amounts is None
+
+
+def test_settled_transaction_is_reused():
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Lunch')
+    trans.add_posting(Posting(('Expenses', 'Food'), {DOLLAR: 10}))
+    assert not trans.verify_balance()
+    assert trans.calc_totals() is trans
+
+    trans.add_posting(Posting(('Assets', 'Cash'), None))
+    assert trans.verify_balance()
+    balanced = trans.calc_totals()
+    assert balanced is not trans
+    assert trans.calc_totals() is balanced
+    assert balanced.postings[1].amounts == {DOLLAR: -10}
+    assert balanced.calc_totals() is balanced
+
+    trans.add_posting(Posting(('Expenses', 'Tip'), {DOLLAR: 2}))
+    assert trans.calc_totals().postings[1].amounts == {DOLLAR: -12}
+    assert pickle.loads(pickle.dumps(trans)).calc_totals() == (
+        trans.calc_totals())
+
+
+def test_two_auto_postings():
+    trans = Transaction(date=arrow.get(datetime(2013, 2, 20)),
+                        description='Lunch')
+    trans.add_posting(Posting(('Expenses', 'Food'), {DOLLAR: 10}))
+    trans.add_posting(Posting(('Assets', 'Cash'), None))
+    trans.add_posting(Posting(('Assets', 'Bank'), None))
+    assert trans.verify_balance()
+    with pytest.raises(ValueError):
+        trans.calc_totals()
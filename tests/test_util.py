@@ -0,0 +1,17 @@
+import itertools
+from ledgeroni.util import head_and_tail
+
+
+def test_head_and_tail():
+    assert list(head_and_tail(range(10))) == list(range(10))
+    assert list(head_and_tail(range(10), head=3)) == [0, 1, 2]
+    assert list(head_and_tail(range(10), tail=3)) == [7, 8, 9]
+    assert list(head_and_tail(range(10), head=5, tail=2)) == [3, 4]
+    assert list(head_and_tail(range(10), head=0)) == []
+    assert list(head_and_tail(range(2), tail=5)) == [0, 1]
+
+
+def test_head_stops_early():
+    items = itertools.count()
+    assert list(head_and_tail(items, head=3)) == [0, 1, 2]
+    assert next(items) == 3